@@ -1,59 +1,63 @@
+import boto3
 import json
+from pawdopt_common.chats import DogNotOwned, upsert_chat
+from pawdopt_common.log import get_logger, log_payload
 
-def lambda_handler(event, context):
-    # Create chat
-    table = 'chat'
-    response = dynamodb.query(
-        TableName=table,
-        IndexName='adopter_shelter_index',
-        KeyConditionExpression='adopter_id = :adopter_id AND shelter_id = :shelter_id',
-        ExpressionAttributeValues={
-            ':adopter_id': {'S': adopter_id},
-            ':shelter_id': {'S': shelter_id}
-        }
-    )
-
-    items = response['Items']
-    if items and len(items) == 1:
-        items = items[0]
-        dog_ids = items['dog_ids']['L']
-        dog_ids.append({'S': dog_id})
-        dog_created_ats = items['dog_created_ats']['L']
-        dog_created_ats.append({'S': dog_created_at})
-        chat_id = items['chat_id']['S']
-        new = dynamodb.update_item(
-            TableName=table,
-            Key={
-                'chat_id': {'S': chat_id}
-            },
-            UpdateExpression="set dog_ids=:dogs, dog_created_ats=:dcas",
-            ExpressionAttributeValues={
-                ':dogs': {'L': dog_ids},
-                ':dcas': {'L': dog_created_ats}
-            },
-            ReturnValues="ALL_NEW"
-        )
-    else:
-        chat_id = str(uuid.uuid4())
-        dynamodb.put_item(
-            TableName=table,
-            Item={
-                'chat_id': {'S': chat_id},
-                'adopter_id': {'S': adopter_id},
-                'shelter_id': {'S': shelter_id},
-                'dog_ids': {'L': [{'S': dog_id}]},
-                'dog_created_ats': {'L': [{'S': dog_created_at}]},            
-            }
-        )
-        new = dynamodb.get_item(
-            TableName=table,
-            Key={
-                'chat_id': {'S': chat_id}
-            }
-        )['Item']
+logger = get_logger(__name__)
+
+dynamodb = boto3.client('dynamodb')
 
 
+def respond(err, res=None, status_code=None):
     return {
-        'statusCode': 200,
-        'body': json.dumps('Hello from Lambda!')
+        'statusCode': status_code or ('400' if err else '200'),
+        'body': json.dumps({"error": err} if err else res),
+        'headers': {
+            'Content-Type': 'application/json',
+        },
     }
+
+def lambda_handler(event, context):
+    """
+    Open or extend the chat between an adopter and a shelter for a dog.
+
+    Called by a shelter through the API with {"adopterId", "dogId",
+    "dogCreatedAt"}, or programmatically with {"adopter_id", "shelter_id",
+    "dog_id", "dog_created_at"}.
+    """
+    log_payload(logger, 'Event', event)
+    try:
+        if 'requestContext' in event:
+            claims = event['requestContext']['authorizer']['jwt']['claims']
+            if claims.get('custom:role') != 'shelter':
+                return respond('Forbidden user', status_code='403')
+            body = json.loads(event.get('body') or '{}')
+            adopter_id = body['adopterId']
+            shelter_id = claims['sub']
+            dog_id = body['dogId']
+            dog_created_at = body['dogCreatedAt']
+        else:
+            adopter_id = event['adopter_id']
+            shelter_id = event['shelter_id']
+            dog_id = event['dog_id']
+            dog_created_at = event['dog_created_at']
+    except KeyError as e:
+        return respond(f'Missing required field: {e}')
+
+    try:
+        chat = upsert_chat(dynamodb, adopter_id, shelter_id, dog_id, dog_created_at)
+    except DogNotOwned:
+        return respond('Dog not found for this shelter', status_code='403')
+    except Exception as e:
+        logger.exception('Could not accept request for dog %s: %s', dog_id, e)
+        return respond(str(e), status_code='500')
+
+    return respond(None, {
+        'chatId': chat['chat_id'],
+        'adopterId': chat['adopter_id'],
+        'shelterId': chat['shelter_id'],
+        'dogIds': chat.get('dog_ids', []),
+        'dogCreatedAts': chat.get('dog_created_ats', []),
+        'status': chat.get('status'),
+        'createdAt': chat.get('created_at'),
+    })
@@ -1,7 +1,10 @@
 import json
 import boto3
 import os
-import traceback
+from pawdopt_common.shelter_locations import put_shelter_location
+from pawdopt_common.log import get_logger, log_payload
+
+logger = get_logger(__name__)
 
 COGNITO_USER_POOL_ID = os.environ.get('COGNITO_USER_POOL_ID')
 COGNITO_CLIENT_ID = os.environ.get('COGNITO_CLIENT_ID')
@@ -45,7 +48,7 @@ def lambda_handler(event, context):
         latitude = body.get('latitude', '')
         longitude = body.get('longitude', '')
 
-        print(f"Processing signup for email: {email}, role: {role}")
+        logger.info("Processing signup for role: %s", role)
 
         if not all([email, password, address, postcode, phoneNo, role]):
             return {
@@ -86,7 +89,7 @@ def lambda_handler(event, context):
             if longitude.strip():
                 attributes.append({'Name': 'custom:longitude', 'Value': str(longitude)})
 
-        print(f"Creating user with attributes: {attributes}")
+        log_payload(logger, "Creating user with attributes", attributes)
 
         response = client.sign_up(
             ClientId=COGNITO_CLIENT_ID,
@@ -95,14 +98,24 @@ def lambda_handler(event, context):
             UserAttributes=attributes
         )
 
-        print(f"Sign up response: {response}")
+        log_payload(logger, "Sign up response", response)
 
         client.admin_confirm_sign_up(
             UserPoolId=COGNITO_USER_POOL_ID,
             Username=email
         )
 
-        print("User confirmed successfully")
+        logger.info("User confirmed successfully")
+
+        if role == 'shelter' and latitude.strip() and longitude.strip():
+            # Keep the shelter_location projection in step so NearestDogs
+            # never has to ask Cognito where a shelter is. The user already
+            # exists, so a failure here must not fail the signup; the
+            # projection is filled from Cognito on first read instead.
+            try:
+                put_shelter_location(boto3.client('dynamodb'), response['UserSub'], latitude, longitude)
+            except Exception:
+                logger.exception("Could not store location for shelter %s", response['UserSub'])
 
         return {
             'statusCode': 200,
@@ -136,8 +149,7 @@ def lambda_handler(event, context):
         }
 
     except Exception as e:
-        print("Exception occurred:")
-        traceback.print_exc()
+        logger.exception("Exception occurred")
         return {
             'statusCode': 500,
             'headers': CORS_HEADERS,
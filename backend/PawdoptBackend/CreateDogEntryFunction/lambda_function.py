@@ -1,20 +1,220 @@
 import boto3
+import base64
+import codecs
+import io
 import os
 import json
+import tempfile
 import uuid
 from datetime import datetime
-from boto3.dynamodb.conditions import Key
+from pawdopt_common import geohash
+from pawdopt_common.dog_import import FORMATS, detect_format, import_dogs, parse_rows
+from pawdopt_common.photo_variants import link_photos
+from pawdopt_common.signing import DOG_BUCKET
+from pawdopt_common.shelter_locations import get_shelter_locations
+from pawdopt_common.log import get_logger, log_payload
+
+logger = get_logger(__name__)
 
 dynamodb = boto3.resource('dynamodb')
+cognito = boto3.client('cognito-idp')
+s3 = boto3.client('s3')
 TABLE_NAME = 'dog'
+USER_POOL_ID = "USERPOOLID"  # Cognito User Pool ID
+IMPORT_BUCKET = os.environ.get('IMPORT_BUCKET', DOG_BUCKET)
+MAX_PHOTOS = int(os.environ.get('MAX_PHOTOS', '6'))
+PHOTO_APPEND_ATTEMPTS = 3
+
+
+def shelter_geohash(claims):
+    """
+    Geohash cell of the uploading shelter, used by the nearby-dog index.
+
+    None when the shelter has no coordinates: its dogs are stored without
+    a geohash rather than under a made-up location.
+    """
+    lat = claims.get('custom:latitude')
+    lon = claims.get('custom:longitude')
+    if lat and lon:
+        return geohash.encode(float(lat), float(lon))
+    locations = get_shelter_locations(
+        dynamodb.meta.client, [claims['sub']],
+        cognito=cognito, user_pool_id=USER_POOL_ID, default=None
+    )
+    location = locations.get(claims['sub'])
+    return geohash.encode(*location) if location else None
+
+class PhotoAppendError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+def find_created_at(dog_id):
+    """Sort key of an existing dog, for clients that only send dog_id."""
+    items = dynamodb.meta.client.query(
+        TableName=TABLE_NAME,
+        KeyConditionExpression='dog_id = :dog_id',
+        ExpressionAttributeValues={':dog_id': {'S': dog_id}},
+        ProjectionExpression='created_at',
+        Limit=1
+    ).get('Items', [])
+    return items[0]['created_at']['S'] if items else None
+
+def migrate_photo_key(client, dog_id, created_at, legacy_key):
+    """Turn a legacy single-string photo_key into a list, unless it changed meanwhile."""
+    try:
+        client.update_item(
+            TableName=TABLE_NAME,
+            Key={'dog_id': {'S': dog_id}, 'created_at': {'S': created_at}},
+            UpdateExpression='SET photo_key = :photos, updated_at = :now',
+            ConditionExpression='photo_key = :legacy',
+            ExpressionAttributeValues={
+                ':photos': {'L': [{'S': legacy_key}] if legacy_key else []},
+                ':legacy': {'S': legacy_key},
+                ':now': {'S': datetime.utcnow().isoformat()},
+            }
+        )
+        logger.info('Migrated string photo_key of dog %s to a list', dog_id)
+    except client.exceptions.ConditionalCheckFailedException:
+        pass
+
+def append_photos(dog_id, created_at, shelter_id, photo_keys):
+    """
+    Append photo keys to a dog in one conditional UpdateItem.
+
+    The condition checks that the dog exists, belongs to `shelter_id`, has
+    none of the new keys yet and stays within MAX_PHOTOS, so concurrent
+    uploads can never drop or duplicate a photo. When it fails, the old
+    item comes back with the error; keys that are already there are
+    dropped and the rest retried. Older items that store photo_key as a
+    single string are migrated to a list first. Returns the keys actually
+    added.
+    """
+    client = dynamodb.meta.client
+    keys = list(dict.fromkeys(photo_keys))
+    for _ in range(PHOTO_APPEND_ATTEMPTS):
+        if not keys:
+            return []
+        values = {
+            ':photos': {'L': [{'S': key} for key in keys]},
+            ':empty': {'L': []},
+            ':shelter_id': {'S': shelter_id},
+            ':limit': {'N': str(MAX_PHOTOS - len(keys))},
+            ':list': {'S': 'L'},
+            ':now': {'S': datetime.utcnow().isoformat()},
+        }
+        not_present = []
+        for i, key in enumerate(keys):
+            values[f':k{i}'] = {'S': key}
+            not_present.append(f'NOT contains(photo_key, :k{i})')
+        try:
+            client.update_item(
+                TableName=TABLE_NAME,
+                Key={'dog_id': {'S': dog_id}, 'created_at': {'S': created_at}},
+                UpdateExpression=(
+                    'SET photo_key = list_append(if_not_exists(photo_key, :empty), :photos),'
+                    ' updated_at = :now'
+                ),
+                ConditionExpression=(
+                    'attribute_exists(dog_id) AND shelter_id = :shelter_id'
+                    ' AND (attribute_not_exists(photo_key)'
+                    ' OR (attribute_type(photo_key, :list) AND size(photo_key) <= :limit))'
+                    f" AND {' AND '.join(not_present)}"
+                ),
+                ExpressionAttributeValues=values,
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+            return keys
+        except client.exceptions.ConditionalCheckFailedException as e:
+            old = e.response.get('Item')
+            if not old:
+                raise PhotoAppendError('Dog not found', 404)
+            if old['shelter_id']['S'] != shelter_id:
+                raise PhotoAppendError('Forbidden user', 403)
+            stored = old.get('photo_key')
+            if stored and 'L' not in stored:
+                if 'S' not in stored:
+                    raise PhotoAppendError("This dog's photo_key is in an unsupported format", 409)
+                migrate_photo_key(client, dog_id, created_at, stored['S'])
+                continue
+            existing = [item['S'] for item in old.get('photo_key', {}).get('L', [])]
+            keys = [key for key in keys if key not in existing]
+            if len(existing) + len(keys) > MAX_PHOTOS:
+                raise PhotoAppendError(f'A dog can have at most {MAX_PHOTOS} photos', 409)
+    raise PhotoAppendError('Photos changed concurrently, please retry', 409)
+
+def json_response(status_code, body):
+    return {
+        "statusCode": status_code,
+        "body": json.dumps(body),
+        "headers": {
+            "Content-Type": "application/json"
+        }
+    }
+
+def bulk_import(event, claims):
+    """
+    Import many dogs from a CSV or JSON-lines payload, or from an S3 object.
+
+    Inline payloads are bounded by the API's request size and get their
+    per-row report in the response. For {"s3Key": ...} the object is read
+    as a stream and the report is written next to it as
+    <key>.report.jsonl, so neither side is ever held in memory.
+    """
+    if claims.get('custom:role') != 'shelter':
+        return json_response(403, {"error": "Only shelters can import dogs"})
+
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body).decode('utf-8')
+    fmt = detect_format(headers.get('content-type'))
+    cell = shelter_geohash(claims)
+    client = dynamodb.meta.client
+
+    if fmt:
+        report = []
+        created, failed = import_dogs(
+            client, parse_rows(io.StringIO(body, newline=''), fmt), claims['sub'], cell, report.append,
+            table_name=TABLE_NAME
+        )
+        report.sort(key=lambda entry: entry['row'])
+        return json_response(200, {"created": created, "failed": failed, "rows": report})
+
+    request = json.loads(body or '{}')
+    key = request.get('s3Key')
+    if not key:
+        return json_response(400, {"error": "Send text/csv, application/x-ndjson or {\"s3Key\": ...}"})
+    fmt = request.get('format') or detect_format(key=key)
+    if fmt not in FORMATS:
+        return json_response(400, {"error": f"format must be one of {', '.join(FORMATS)}"})
+
+    source = s3.get_object(Bucket=IMPORT_BUCKET, Key=key)['Body']
+    stream = codecs.getreader('utf-8')(source)
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as report_file:
+        def report(entry):
+            report_file.write((json.dumps(entry) + '\n').encode())
+
+        created, failed = import_dogs(
+            client, parse_rows(stream, fmt), claims['sub'], cell, report, table_name=TABLE_NAME
+        )
+        report_file.seek(0)
+        report_key = f'{key}.report.jsonl'
+        s3.upload_fileobj(report_file, IMPORT_BUCKET, report_key)
+
+    logger.info('Imported %d dogs (%d rows failed) for shelter %s from %s', created, failed, claims['sub'], key)
+    return json_response(200, {"created": created, "failed": failed, "reportKey": report_key})
 
 def lambda_handler(event, context):
     try:
-        print("Event received:", json.dumps(event)[:500])
+        if event.get('rawPath', '').endswith('/import'):
+            return bulk_import(event, event['requestContext']['authorizer']['jwt']['claims'])
+
+        log_payload(logger, "Event received", event)
 
         body = json.loads(event['body'])
 
-        dog_id = body.get('dog_id', str(uuid.uuid4()))
+        dog_id = body.get('dog_id') or str(uuid.uuid4())
         name = body.get('name')
         age = body.get('age')
         dob = body.get('dob')
@@ -26,31 +226,28 @@ def lambda_handler(event, context):
         dog_status = body.get('dog_status', 'available')
         photo_keys = body.get('photo_keys', [])
 
-        uploader_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
+        claims = event['requestContext']['authorizer']['jwt']['claims']
+        uploader_id = claims['sub']
         now = datetime.utcnow().isoformat()
 
         table = dynamodb.Table(TABLE_NAME)
 
-        # Check if entry exists
-        response = table.query(
-            KeyConditionExpression=Key('dog_id').eq(dog_id)
-        )
-        items = response.get('Items', [])
-
-        if items:
-            created_at = items[0]['created_at']
-            existing_photos = items[0].get('photo_key', [])
-            if isinstance(existing_photos, str):
-                existing_photos = [existing_photos]
-
-            table.update_item(
-                Key={'dog_id': dog_id, 'created_at': created_at},
-                UpdateExpression="SET photo_key = :photos",
-                ExpressionAttributeValues={':photos': existing_photos + photo_keys}
-            )
+        # An existing dog is addressed by created_at (body or header); only
+        # clients that send a bare dog_id need the key looked up
+        headers = event.get('headers') or {}
+        created_at = body.get('created_at') or headers.get('x-created-at')
+        if not created_at and body.get('dog_id'):
+            created_at = find_created_at(dog_id)
+
+        if created_at:
+            try:
+                photo_keys = append_photos(dog_id, created_at, uploader_id, photo_keys)
+            except PhotoAppendError as e:
+                return json_response(e.status_code, {"error": str(e)})
+            link_photos(dynamodb.meta.client, dog_id, created_at, photo_keys)
             message = f"Updated dog with {len(photo_keys)} new image(s)."
         else:
-            table.put_item(Item={
+            new_dog = {
                 'dog_id': dog_id,
                 'created_at': now,
                 'name': name,
@@ -63,8 +260,14 @@ def lambda_handler(event, context):
                 'description': description,
                 'dog_status': dog_status,
                 'photo_key': photo_keys,
+                'photo_variants': {},
                 'shelter_id': uploader_id
-            })
+            }
+            cell = shelter_geohash(claims)
+            if cell:
+                new_dog['geohash'] = cell
+            table.put_item(Item=new_dog)
+            link_photos(dynamodb.meta.client, dog_id, now, photo_keys)
             message = f"Created dog with {len(photo_keys)} image(s)."
 
         return {
@@ -80,7 +283,7 @@ def lambda_handler(event, context):
         }
 
     except Exception as e:
-        print("Exception:", str(e))
+        logger.exception("Exception: %s", e)
         return {
             "statusCode": 500,
             "body": json.dumps({"error": str(e)})
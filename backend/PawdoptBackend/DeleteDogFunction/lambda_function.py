@@ -1,39 +1,23 @@
 import boto3
 import json
+from pawdopt_common.cleanup import delete_cancellation_status, delete_dog_with_job, get_queue
+from pawdopt_common.photo_variants import all_keys
+from pawdopt_common.signing import DOG_BUCKET
+from pawdopt_common.log import get_logger
 
-print('Loading function')
+logger = get_logger(__name__)
+
+logger.debug('Loading function')
 dynamo = boto3.resource('dynamodb')
-s3 = boto3.client('s3')
 table = dynamo.Table('dog')
-swipe_table = dynamo.Table('swipe')
-request_table = dynamo.Table('request')
-chat_table = dynamo.Table('chat')
+queue = get_queue()
 
-def respond(err=None):
+def respond(err=None, status_code=None):
     return {
-        'statusCode': '400' if err else '204',
+        'statusCode': status_code or ('400' if err else '204'),
         'body': str(err) if err else None,
     }
 
-def delete_related_items(table, dog_id, key_names):
-    """
-    Delete all items from a table that reference a dog_id using a GSI.
-    
-    table: DynamoDB Table resource
-    index_name: GSI name where dog_id is the partition key
-    dog_id: ID of the dog to match
-    key_names: list of PK/SK attribute names required to delete from the base table
-    """
-    resp = table.query(
-        IndexName="dog_id-index",
-        KeyConditionExpression=Key("dog_id").eq(dog_id)
-    )
-    items = resp.get("Items", [])
-    with table.batch_writer() as batch:
-        for item in items:
-            key_dict = {k: item[k] for k in key_names}
-            batch.delete_item(Key=key_dict)
-
 def lambda_handler(event, context):
     operation = event['requestContext']['http']['method']
     if operation == 'DELETE':
@@ -51,18 +35,21 @@ def lambda_handler(event, context):
         role = event['requestContext']['authorizer']['jwt']['claims']['custom:role']
 
         if role == "shelter":
-            item = table.get_item(Key={'dog_id': dog_id, 'created_at': created_at})['Item']
+            item = table.get_item(Key={'dog_id': dog_id, 'created_at': created_at}).get('Item')
             if not item:
                 return respond('Dog not found', status_code='404')
             elif item['shelter_id'] != event['requestContext']['authorizer']['jwt']['claims']['sub']:
                 return respond('Forbidden user', status_code='403')
-            keys = item['photo_key']
-            for key in keys:
-                s3.delete_object(Bucket='DOG_BUCKET', Key=key) # Replace with your bucket
-            table.delete_item(Key={'dog_id': dog_id, 'created_at': created_at})
-            delete_related_items(chat_table, dog_id, ["chat_id"])
-            delete_related_items(request_table, dog_id, ["request_id", "created_at"])
-            delete_related_items(swipe_table, dog_id, ["adopter_id", "swiped_at"])
+            # The dog delete and its cleanup job commit together or not at all
+            try:
+                delete_dog_with_job(
+                    dynamo.meta.client, dog_id, created_at, item['shelter_id'],
+                    all_keys(item), DOG_BUCKET
+                )
+            except dynamo.meta.client.exceptions.TransactionCanceledException as e:
+                message, status = delete_cancellation_status(e)
+                return respond(message, status_code=str(status))
+            queue.send({'dog_id': dog_id})
 
             return respond()
 
@@ -0,0 +1,65 @@
+import boto3
+import json
+import os
+from pawdopt_common.cleanup import CLEANUP_JOB_TABLE, PENDING, get_queue, run_job
+from pawdopt_common.scan import parallel_scan
+from pawdopt_common.log import get_logger
+
+logger = get_logger(__name__)
+
+dynamo = boto3.client('dynamodb')
+s3 = boto3.client('s3')
+# Run as a script, jobs go through an in-process queue
+queue = get_queue(kind='local' if __name__ == '__main__' else None)
+
+# Stop starting new pages once less than this much of the invocation is left
+SAFETY_MARGIN_MS = int(os.environ.get('CLEANUP_SAFETY_MARGIN_MS', '20000'))
+
+
+def pending_jobs():
+    """Dog ids of unfinished cleanup jobs, for the scheduled sweep."""
+    for job in parallel_scan(
+        dynamo, CLEANUP_JOB_TABLE, total_segments=1,
+        FilterExpression='#status = :pending',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={':pending': {'S': PENDING}},
+        ProjectionExpression='dog_id',
+    ):
+        yield job['dog_id']
+
+
+def process(dog_id, context=None, requeue=queue):
+    """Run one job until it finishes or time runs short, then requeue the rest."""
+    def should_stop():
+        return context is not None and context.get_remaining_time_in_millis() < SAFETY_MARGIN_MS
+
+    if not run_job(dynamo, s3, dog_id, should_stop=should_stop):
+        requeue.send({'dog_id': dog_id})
+
+
+def lambda_handler(event, context):
+    """
+    Process dog cleanup jobs.
+
+    Invoked by the cleanup queue (SQS records carrying {"dog_id"}), directly
+    with {"dog_id"}, or on a schedule to pick up jobs whose message was lost.
+    """
+    if 'Records' in event:
+        dog_ids = [json.loads(record['body'])['dog_id'] for record in event['Records']]
+    elif 'dog_id' in event:
+        dog_ids = [event['dog_id']]
+    else:
+        dog_ids = list(pending_jobs())
+
+    logger.info('Processing %d cleanup jobs', len(dog_ids))
+    for dog_id in dog_ids:
+        process(dog_id, context)
+    return {'processed': len(dog_ids)}
+
+
+if __name__ == '__main__':
+    # Local run: python lambda_function.py <dog_id> ...
+    import sys
+    for dog_id in sys.argv[1:]:
+        queue.send({'dog_id': dog_id})
+    queue.drain(lambda message: process(message['dog_id']))
@@ -0,0 +1,56 @@
+import boto3
+import sys
+from urllib.parse import unquote_plus
+from pawdopt_common.images import LocalBucket, S3Bucket, is_photo_upload, resize_upload
+from pawdopt_common.photo_variants import record_variants
+from pawdopt_common.log import get_logger
+
+logger = get_logger(__name__)
+
+s3 = boto3.client('s3')
+dynamodb = boto3.client('dynamodb')
+
+
+def process(bucket, key, client=None):
+    """Resize one upload and, given a DynamoDB client, record its variants."""
+    written = resize_upload(bucket, key)
+    logger.info(
+        'Resized %s: %s', key,
+        ', '.join(f'{name} {size / 1024:.1f} KiB' for name, (_, size) in written.items())
+    )
+    if client is not None:
+        record_variants(client, key, {name: out_key for name, (out_key, _) in written.items()})
+    return written
+
+
+def lambda_handler(event, context):
+    """
+    Make thumb, card and full variants of photos as they are uploaded.
+
+    Subscribed to ObjectCreated events on the photo bucket. Variants are
+    written under variants/ in the same bucket, which this function skips,
+    as it does anything without an image extension (such as dog imports
+    and their reports).
+    """
+    processed = 0
+    for record in event.get('Records', []):
+        bucket_name = record['s3']['bucket']['name']
+        key = unquote_plus(record['s3']['object']['key'])
+        if not is_photo_upload(key):
+            logger.debug('Skipping %s', key)
+            continue
+        try:
+            process(S3Bucket(s3, bucket_name), key, dynamodb)
+            processed += 1
+        except Exception as e:
+            # A bad image must not block the rest of the batch; readers fall back to the original
+            logger.exception('Could not resize %s: %s', key, e)
+    return {'processed': processed}
+
+
+if __name__ == '__main__':
+    # Local run against a directory standing in for the bucket:
+    # python lambda_function.py <bucket dir> <key> ...
+    local = LocalBucket(sys.argv[1])
+    for key in sys.argv[2:]:
+        process(local, key)
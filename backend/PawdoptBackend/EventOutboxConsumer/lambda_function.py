@@ -0,0 +1,27 @@
+import boto3
+from pawdopt_common.events import SUBSCRIBERS, get_dispatcher, read_outbox_item
+from pawdopt_common.log import get_logger
+
+logger = get_logger(__name__)
+
+# Delivery to subscribers is always by direct invocation
+dispatcher = get_dispatcher(SUBSCRIBERS, kind='lambda', lambda_client=boto3.client('lambda'))
+
+
+def lambda_handler(event, context):
+    """
+    Deliver events written to the event_outbox table.
+
+    Subscribed to the table's DynamoDB stream (NEW_IMAGE). Only inserts are
+    events; any failure raises so the stream retries the batch, which means
+    subscribers can see an event more than once.
+    """
+    events = [
+        read_outbox_item(record['dynamodb']['NewImage'])
+        for record in event.get('Records', [])
+        if record.get('eventName') == 'INSERT'
+    ]
+    if events:
+        dispatcher.publish(*events)
+    logger.info('Delivered %d outbox events', len(events))
+    return {'delivered': len(events)}
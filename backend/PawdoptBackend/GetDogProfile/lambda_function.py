@@ -1,28 +1,47 @@
 import boto3
 import json
 import base64
+import os
 from boto3.dynamodb.types import TypeDeserializer
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pawdopt_common.cache import LRUCache
+from pawdopt_common.dynamo_batch import get_dogs
+from pawdopt_common.http_cache import (
+    combined_etag, dog_etag, last_modified, not_modified, not_modified_response, validator_headers
+)
+from pawdopt_common.photo_variants import view_keys
+from pawdopt_common.signing import PhotoSigner
+from pawdopt_common.log import get_logger, log_payload
+
+logger = get_logger(__name__)
 USER_POOL_ID = "USERPOOLID"  # Cognito User Pool ID
+MAX_BATCH_DOGS = int(os.environ.get('MAX_BATCH_DOGS', '50'))
+PHOTO_VIEWS = ('thumb', 'card', 'full')
+SHELTER_INFO_CACHE_TTL_SECONDS = float(os.environ.get('SHELTER_INFO_CACHE_TTL_SECONDS', '300'))
 
 
 dynamo = boto3.client('dynamodb')
 cognito = boto3.client('cognito-idp')
 s3 = boto3.client('s3')
+signer = PhotoSigner(s3)
+shelter_cache = LRUCache(maxsize=1000, ttl=SHELTER_INFO_CACHE_TTL_SECONDS)
 
 
 
-def respond(err, res=None, status_code = None, next_link = None, count = None):
+def respond(err, res=None, status_code = None, next_link = None, count = None, extra_headers = None):
     headers = {
             'Content-Type': 'application/json',
     }
+    if extra_headers:
+        headers.update(extra_headers)
     body = res
     resp = {
         'statusCode': status_code or ('400' if err else '200'),
         'body': {"message": err} if err else json.dumps(body),
         'headers': headers
     }
-    print('resp: ', resp)
+    log_payload(logger, 'Response', resp)
     return resp
 
 deserialiser = TypeDeserializer()
@@ -36,27 +55,36 @@ def calculate_age(dob):
     age = today.year - born.year - (today.month < (born.month))
     return age
 
-def sanitise_output(dog):
+def sanitise_output(dog, view='full'):
     if 'photo_key' in dog:
-        pk = dog['photo_key']
-        presigned_urls = []
-        for key in pk:
-            presigned_urls.append(s3.generate_presigned_url(
-                ClientMethod='get_object',
-                Params={'Bucket': 'DOG_BUCKET', 'Key': key}, # Replace with your Dog Bucket
-                ExpiresIn=3600
-            ))
-        dog['photoURLs'] = presigned_urls
+        dog['photoURLs'] = signer.sign_all(view_keys(dog, view))
         del dog['photo_key']
+    dog.pop('photo_variants', None)
     dog['age'] = calculate_age(dog['dob'])
     return dog
 
+def shelter_info(shelter_id):
+    """Shelter contact fields from Cognito, cached per container."""
+    info = shelter_cache.get(shelter_id)
+    if info is None:
+        user = cognito.admin_get_user(UserPoolId=USER_POOL_ID, Username=shelter_id)
+        attrs = {a["Name"]: a["Value"] for a in user["UserAttributes"]}
+        info = {
+            'shelter_name': attrs.get("name"),
+            'shelter_email': attrs.get("email"),
+            'shelter_contact': attrs.get("phone_number"),
+            'shelter_address': attrs.get("address"),
+            'shelter_postcode': attrs.get("custom:postcode"),
+        }
+        shelter_cache.set(shelter_id, info)
+    return dict(info)
+
 def lambda_handler(event, context):
     operation = event['requestContext']['http']['method']
     if operation == 'GET':
         # Authorise
         headers = event['headers']
-        print(event)
+        log_payload(logger, 'Event', event)
         auth_header = headers['authorization']
         if not auth_header:
             return respond('Not authorised', status_code='401')
@@ -69,27 +97,25 @@ def lambda_handler(event, context):
 
         try:
             if role == "adopter" or role == "shelter":
-                item = dynamo.get_item(TableName='dog', Key={'dog_id': {'S': dog_id}, 'created_at': {'S': created_at}})['Item']
+                item = dynamo.get_item(TableName='dog', Key={'dog_id': {'S': dog_id}, 'created_at': {'S': created_at}}).get('Item')
                 
                 if not item:
                     return respond('Not found', status_code='404')
 
                 dictdb = dynamodb_to_dict(item)
-                print('dictdb before cognito: ', dictdb)
+
+                # Revalidate before the Cognito lookup and photo signing
+                etag = dog_etag(dictdb, signer.current_window())
+                modified = last_modified([dictdb], signer.window_start())
+                if not_modified(headers, etag, modified):
+                    return not_modified_response(etag, modified)
 
                 # Add shelter info
-                user = cognito.admin_get_user(UserPoolId=USER_POOL_ID, Username=dictdb['shelter_id'])
-                attrs = {a["Name"]: a["Value"] for a in user["UserAttributes"]}
-                
-                dictdb['shelter_name'] = attrs.get("name")
-                dictdb['shelter_email'] = attrs.get("email")
-                dictdb['shelter_contact'] = attrs.get("phone_number")
-                dictdb['shelter_address'] = attrs.get("address")
-                dictdb['shelter_postcode'] = attrs.get("custom:postcode")
+                dictdb.update(shelter_info(dictdb['shelter_id']))
 
-                print('dictdb after cognito: ', dictdb)
+                log_payload(logger, 'Dog with shelter info', dictdb)
 
-                return respond(None, sanitise_output(dictdb))
+                return respond(None, sanitise_output(dictdb), extra_headers=validator_headers(etag, modified))
 
             else:
                 return respond('Forbidden user', status_code='403')
@@ -97,7 +123,69 @@ def lambda_handler(event, context):
         except Exception as e:
             return respond(str(e))
 
-    elif operation in ['POST', 'PATCH', 'DELETE', 'OPTION']:
+    elif operation == 'POST':
+        # Batch mode: {"dogs": [{"dogId": ..., "createdAt": ...}, ...], "view": "thumb"|"card"|"full"}
+        headers = event['headers']
+        log_payload(logger, 'Event', event)
+        if not headers.get('authorization'):
+            return respond('Not authorised', status_code='401')
+
+        role = event['requestContext']['authorizer']['jwt']['claims']['custom:role']
+        if role not in ("adopter", "shelter"):
+            return respond('Forbidden user', status_code='403')
+
+        try:
+            body = json.loads(event.get('body') or '{}')
+            keys = [(d['dogId'], d['createdAt']) for d in body.get('dogs', [])]
+            view = body.get('view', 'full')
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            return respond(f'Invalid request body: {str(e)}')
+        if not keys:
+            return respond('No dogs requested')
+        if len(keys) > MAX_BATCH_DOGS:
+            return respond(f'At most {MAX_BATCH_DOGS} dogs per request')
+        if view not in PHOTO_VIEWS:
+            return respond(f"view must be one of {', '.join(PHOTO_VIEWS)}")
+
+        try:
+            dogs = get_dogs(dynamo, keys)
+
+            window = signer.current_window()
+            found = [dog for dog in dogs if dog]
+            etag = combined_etag(
+                [dog_etag(dog, window) if dog else None for dog in dogs],
+                keys, view
+            )
+            # Only If-None-Match: a dog dropping out of the batch leaves Last-Modified unchanged
+            if not_modified(headers, etag):
+                return not_modified_response(etag)
+
+            # One Cognito lookup per distinct shelter, run concurrently
+            shelter_ids = list({dog['shelter_id'] for dog in found if dog.get('shelter_id')})
+            with ThreadPoolExecutor(max_workers=max(1, min(8, len(shelter_ids)))) as pool:
+                shelters = dict(zip(shelter_ids, pool.map(shelter_info, shelter_ids)))
+
+            profiles = []
+            missing = []
+            for (dog_id, created_at), dog in zip(keys, dogs):
+                if not dog:
+                    missing.append({'dogId': dog_id, 'createdAt': created_at})
+                    continue
+                # A malformed stored dog is reported as missing, not as a bad request
+                try:
+                    dog.update(shelters.get(dog.get('shelter_id'), {}))
+                    profiles.append(sanitise_output(dog, view))
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.warning('Could not format dog %s: %s', dog_id, e)
+                    missing.append({'dogId': dog_id, 'createdAt': created_at})
+
+            return respond(None, {'dogs': profiles, 'missing': missing}, extra_headers=validator_headers(etag))
+
+        except Exception as e:
+            logger.exception('Batch dog profile read failed')
+            return respond(str(e), status_code='500')
+
+    elif operation in ['PATCH', 'DELETE', 'OPTION']:
         return respond('Wrong lambda function', status_code='500')
     else:
         return respond(f'Unsupported method {operation}', status_code='500')
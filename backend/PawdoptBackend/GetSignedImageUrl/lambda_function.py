@@ -1,7 +1,12 @@
 import boto3
 import json
 import os
+import uuid
 from botocore.config import Config
+from pawdopt_common.signing import DOG_BUCKET, PhotoSigner
+from pawdopt_common.log import get_logger
+
+logger = get_logger(__name__)
 
 # # Configure the S3 client to use the correct regional endpoint
 config = Config(
@@ -9,10 +14,55 @@ config = Config(
 )
 s3 = boto3.client('s3')
 
+ICON_BUCKET = os.environ.get('ICON_BUCKET', 'ICON_BUCKET')  # Replace with your Icon Bucket
+BUCKETS = {ICON_BUCKET, DOG_BUCKET}
+MAX_SIGN_ITEMS = int(os.environ.get('MAX_SIGN_ITEMS', '100'))
+UPLOAD_CONTENT_TYPES = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp'}
+
+# One signer per container: repeat GETs within a window reuse the same URL
+signer = PhotoSigner(s3, bucket=ICON_BUCKET)
+
+def json_response(status_code, body):
+    return {
+        "statusCode": status_code,
+        "body": json.dumps(body),
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*"
+        }
+    }
+
+def sign_item(item, uploader_id):
+    """Sign one {"key", "op", "contentType", "bucket"} entry, or report why not."""
+    op = item.get('op', 'get')
+    bucket = item.get('bucket') or ICON_BUCKET
+    if bucket not in BUCKETS:
+        return {"key": item.get('key'), "op": op, "error": "Unknown bucket"}
+
+    if op == 'get':
+        if not item.get('key'):
+            return {"op": op, "error": "key is required"}
+        return {"key": item['key'], "op": op, "url": signer.sign(item['key'], bucket)}
+
+    if op == 'put':
+        content_type = item.get('contentType', 'image/jpeg')
+        if content_type not in UPLOAD_CONTENT_TYPES:
+            return {"key": item.get('key'), "op": op, "error": f"Unsupported content type {content_type}"}
+        # Uploads only ever go under the caller's own prefix
+        key = item.get('key') or f"{uploader_id}/{uuid.uuid4()}.{UPLOAD_CONTENT_TYPES[content_type]}"
+        if not key.startswith(f"{uploader_id}/"):
+            return {"key": key, "op": op, "error": "Uploads must be under your own prefix"}
+        return {"key": key, "op": op, "url": signer.sign_upload(key, content_type, bucket)}
+
+    return {"key": item.get('key'), "op": op, "error": "op must be get or put"}
+
 def lambda_handler(event, context):
     """
-    Generates a pre-signed URL for a single private S3 icon.
-    This function expects a POST request with a JSON body.
+    Generates pre-signed URLs for private S3 objects.
+    This function expects a POST request with a JSON body: either
+    {"key", "bucket"} for one download URL, or {"items": [...]} with up to
+    MAX_SIGN_ITEMS {"key", "op": "get"|"put", "contentType", "bucket"}
+    entries, answered in order in one response.
     """
     try:
         # Check if the request body is present
@@ -28,15 +78,31 @@ def lambda_handler(event, context):
 
         # Parse the JSON body to get the S3 key and bucket
         body = json.loads(event['body'])
+        if not isinstance(body, dict):
+            return json_response(400, {"error": "Request body must be a JSON object"})
+
+        if 'items' in body:
+            items = body['items']
+            if not isinstance(items, list) or not items:
+                return json_response(400, {"error": "items must be a non-empty list"})
+            if len(items) > MAX_SIGN_ITEMS:
+                return json_response(400, {"error": f"At most {MAX_SIGN_ITEMS} items per request"})
+            if not all(isinstance(item, dict) for item in items):
+                return json_response(400, {"error": "Each item must be an object"})
+            claims = event.get('requestContext', {}).get('authorizer', {}).get('jwt', {}).get('claims', {})
+            uploader_id = claims.get('sub')
+            if not uploader_id and any(item.get('op') == 'put' for item in items):
+                return json_response(401, {"error": "Sign in to request upload URLs"})
+            return json_response(200, {"items": [sign_item(item, uploader_id) for item in items]})
+
         key = body['key']
-        bucket_name = body.get('bucket', 'ICON_BUCKET') # Default to your icon bucket
+        bucket_name = body.get('bucket', ICON_BUCKET) # Default to your icon bucket
+
+        if bucket_name not in BUCKETS:
+            return json_response(400, {"error": "Unknown bucket"})
 
         # Generate the pre-signed URL for a 'get_object' request
-        presigned_url = s3.generate_presigned_url(
-            ClientMethod='get_object',
-            Params={'Bucket': bucket_name, 'Key': key},
-            ExpiresIn=3600
-        )
+        presigned_url = signer.sign(key, bucket_name)
 
         # Return the signed URL in a successful response
         return {
@@ -48,7 +114,7 @@ def lambda_handler(event, context):
             }
         }
     except Exception as e:
-        print(f"Error generating pre-signed URL: {e}")
+        logger.exception("Error generating pre-signed URL: %s", e)
         return {
             "statusCode": 500,
             "body": json.dumps({"error": str(e)}),
@@ -1,18 +1,42 @@
 import boto3
 import json
-import base64
 from boto3.dynamodb.types import TypeDeserializer
 from datetime import datetime
+import time
+from bisect import bisect_left
+from pawdopt_common.deck import build_deck
+from pawdopt_common.pagination import decode_cursor, encode_cursor
+from pawdopt_common.dynamo_batch import get_dogs
+from pawdopt_common.http_cache import (
+    combined_etag, dog_etag, not_modified, not_modified_response, validator_headers
+)
+from pawdopt_common.projections import CARD_ATTRIBUTES
+from pawdopt_common.photo_variants import view_keys
+from pawdopt_common.signing import PhotoSigner
+from pawdopt_common.log import get_logger, log_payload
+
+logger = get_logger(__name__)
 
 dynamo = boto3.client('dynamodb')
+cognito = boto3.client('cognito-idp')
 s3 = boto3.client('s3')
+signer = PhotoSigner(s3)
 
+USER_POOL_ID = "USERPOOLID"  # Cognito User Pool ID
+SWIPE_DOGS_TABLE = 'swipe_dogs'
+SHELTER_INDEX_NAME = 'shelter_id-created_at-index'
+DEFAULT_LOCATION = (51.5074, -0.1278)  # London
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
 
 
-def respond(err, res=None, status_code = None, next_link = None, count = None):
+
+def respond(err, res=None, status_code = None, next_link = None, count = None, extra_headers = None):
     headers = {
             'Content-Type': 'application/json',
     }
+    if extra_headers:
+        headers.update(extra_headers)
     if next_link:
         headers['x-next'] = next_link
     body = {"dogs": res}
@@ -23,7 +47,7 @@ def respond(err, res=None, status_code = None, next_link = None, count = None):
         'body': {"message": err} if err else json.dumps(body),
         'headers': headers
     }
-    print(resp)
+    log_payload(logger, 'Response', resp)
     return resp
 
 deserialiser = TypeDeserializer()
@@ -40,25 +64,85 @@ def calculate_age(dob):
 def sanitise_output(dogarr):
     for item in dogarr:
         if 'photo_key' in item:
-            pk = item['photo_key']
-            presigned_urls = []
-            for key in pk:
-                presigned_urls.append(s3.generate_presigned_url(
-                    ClientMethod='get_object',
-                    Params={'Bucket': 'DOG_BUCKET', 'Key': key}, # Replace with your Dog Bucket
-                    ExpiresIn=3600
-                ))
-            item['photoURLs'] = presigned_urls
+            item['photoURLs'] = signer.sign_all(view_keys(item, 'card'))
             del item['photo_key']
+        item.pop('photo_variants', None)
         item['age'] = calculate_age(item['dob'])  # might be wrong pls check
     return dogarr
 
+def adopter_location(claims):
+    """Adopter's coordinates from the ID token, then Cognito, then London."""
+    lat = claims.get('custom:latitude')
+    lon = claims.get('custom:longitude')
+    if not lat or not lon:
+        try:
+            user = cognito.admin_get_user(UserPoolId=USER_POOL_ID, Username=claims['sub'])
+            attrs = {a["Name"]: a["Value"] for a in user["UserAttributes"]}
+            lat = attrs.get("custom:latitude")
+            lon = attrs.get("custom:longitude")
+        except Exception as e:
+            logger.warning('Using default adopter location due to Cognito error: %s', e)
+    if not lat or not lon:
+        return DEFAULT_LOCATION
+    return float(lat), float(lon)
+
+def load_deck(claims):
+    """
+    Return the adopter's deck snapshot from swipe_dogs, building it if needed.
+
+    The deck is ranked once per login session (the token's auth_time) and
+    expires with the token. Dogs swiped since it was built are recorded in
+    its `swiped` set by SwipeCreate and skipped when paging.
+    """
+    adopter_id = claims['sub']
+    session = str(claims.get('auth_time', ''))
+    item = dynamo.get_item(TableName=SWIPE_DOGS_TABLE, Key={'adopter_id': {'S': adopter_id}}).get('Item')
+    if item and item.get('session', {}).get('S') == session and int(item['ttl']['N']) > time.time():
+        return {
+            'dog_ids': [d['S'] for d in item['dog_ids']['L']],
+            'dog_created_ats': [d['S'] for d in item['dog_created_ats']['L']],
+            'distances': [float(d['N']) for d in item['distances']['L']],
+            'swiped': set(item.get('swiped', {}).get('SS', [])),
+        }
+
+    lat, lon = adopter_location(claims)
+    ranked = build_deck(dynamo, 'dog', adopter_id, lat, lon, cognito=cognito, user_pool_id=USER_POOL_ID)
+    logger.info('Built deck of %d dogs for adopter %s', len(ranked), adopter_id)
+    dynamo.put_item(
+        TableName=SWIPE_DOGS_TABLE,
+        Item={
+            'adopter_id': {'S': adopter_id},
+            'dog_ids': {'L': [{'S': dog_id} for dog_id, _, _ in ranked]},
+            'dog_created_ats': {'L': [{'S': created_at} for _, created_at, _ in ranked]},
+            'distances': {'L': [{'N': str(distance)} for _, _, distance in ranked]},
+            'count': {'N': str(len(ranked))},
+            'session': {'S': session},
+            'ttl': {'N': str(claims['exp'])}
+        }
+    )
+    return {
+        'dog_ids': [dog_id for dog_id, _, _ in ranked],
+        'dog_created_ats': [created_at for _, created_at, _ in ranked],
+        'distances': [distance for _, _, distance in ranked],
+        'swiped': set(),
+    }
+
+def page_etag(dogs, *extra):
+    """
+    Combined ETag for a page of dogs, before signing.
+
+    Pages carry no Last-Modified: a dog leaving the page doesn't move the
+    newest stamp of those left, so only If-None-Match can revalidate them.
+    """
+    window = signer.current_window()
+    return combined_etag([dog_etag(dog, window) for dog in dogs], *extra)
+
 def lambda_handler(event, context):
     operation = event['requestContext']['http']['method']
     if operation == 'GET':
         # Authorise
         headers = event['headers']
-        print(event)
+        log_payload(logger, 'Event', event)
         auth_header = headers['authorization']
         if not auth_header:
             return respond('Not authorised', status_code='401')
@@ -73,26 +157,26 @@ def lambda_handler(event, context):
 
         try:
             next_tok = headers.get('x-next')
-            start_key = None
-            if next_tok:
-                start_key = json.loads(base64.b64decode(next_tok))
 
             if role == "shelter":
-
-                scan_kwargs = {
+                # Only this shelter's dogs are read, newest first
+                query_kwargs = {
                     'TableName': 'dog',
-                    'FilterExpression': 'shelter_id = :shelter_id',
+                    'IndexName': SHELTER_INDEX_NAME,
+                    'KeyConditionExpression': 'shelter_id = :shelter_id',
                     'ExpressionAttributeValues': {':shelter_id': {'S': event['requestContext']['authorizer']['jwt']['claims']['sub']}},
+                    'ScanIndexForward': False,
                 }
 
+                start_key = decode_cursor(next_tok)
                 if start_key:
-                    scan_kwargs['ExclusiveStartKey'] = start_key
+                    query_kwargs['ExclusiveStartKey'] = start_key
 
                 if limit:
-                    scan_kwargs['Limit'] = int(limit)
+                    query_kwargs['Limit'] = int(limit)
 
-                print(scan_kwargs)
-                response = dynamo.scan(**scan_kwargs)
+                logger.debug('Query kwargs: %s', query_kwargs)
+                response = dynamo.query(**query_kwargs)
 
                 items = response['Items']
 
@@ -100,76 +184,56 @@ def lambda_handler(event, context):
                 if 'Items' not in response:
                     return respond('Dog not found', status_code='404')
                 elif 'LastEvaluatedKey' in response:
-                    xnext = base64.b64encode(json.dumps(response['LastEvaluatedKey']).encode()).decode()
+                    xnext = encode_cursor(response['LastEvaluatedKey'])
                 
                 dictdb = [dynamodb_to_dict(r) for r in items]
 
-                return respond(None, sanitise_output(dictdb), next_link = xnext)
-
-            # elif role == "adopter":
-            #     adopter_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
-            #     if page and limit:
-            #         page = int(page)
-            #         limit = int(limit)
-
-            #         dog_items = dynamo.get_item(
-            #             TableName='swipe_dogs',
-            #             Key={
-            #                 'adopter_id': {'S': adopter_id}
-            #             },
-            #             ProjectionExpression='dog_ids, dog_created_ats, #c',
-            #             ExpressionAttributeNames={'#c': 'count'}
-            #         ).get('Item')
-
-            #         if not dog_items:
-            #             # Filter dogs and store in swipe_dogs if page = 1, return as a list of dog_ids and compare with orig list...
-            #             # For now its all dogs available
-            #             response = dynamo.scan(
-            #                 TableName='dog',
-            #                 ProjectionExpression='dog_id, created_at'
-            #             )
-            #             dog_ids = [item['dog_id'] for item in response['Items']]
-            #             count = len(dog_ids)
-            #             dog_created_ats = [item['created_at'] for item in response['Items']]
-            #             dog_items = {
-            #                 'dog_ids': {'L': dog_ids},
-            #                 'dog_created_ats': {'L': dog_created_ats},
-            #                 'count': {'N': count}
-            #             }
-
-            #             dynamo.put_item(
-            #                 TableName='swipe_dogs',
-            #                 Item={
-            #                     'adopter_id': {'S': adopter_id},
-            #                     'dog_ids': {'L': dog_ids},
-            #                     'dog_created_ats': {'L': dog_created_ats},
-            #                     'count': {'N': str(count)},
-            #                     'ttl': {'N': event['requestContext']['authorizer']['jwt']['claims']['exp']}
-            #                 }
-            #             )
-            #         else:
-            #             dog_ids = dog_items['dog_ids']['L']
-            #             dog_created_ats = dog_items['dog_created_ats']['L']
-            #             count = dog_items['count']['N']
-
-            #         dogs = []
-            #         for i in range (limit*page, limit*(page+1)):
-            #             if i >= int(count):
-            #                 break
-            #             dog = dynamo.get_item(
-            #                 TableName='dog',
-            #                 Key={
-            #                     'dog_id': dog_ids[i],
-            #                     'created_at': dog_created_ats[i]
-            #                 }
-            #             )
-            #             dogitem = dog['Item']
-            #             dogs.append(dogitem)
-            #         dognew = [dynamodb_to_dict(d) for d in dogs]
-            #         sanitised = sanitise_output(dognew)
-            #         return respond(None, sanitised, count = count)
-                #else:
-                    # Adopter wish list
+                etag = page_etag(dictdb, xnext)
+                if not_modified(headers, etag):
+                    return not_modified_response(etag)
+
+                return respond(None, sanitise_output(dictdb), next_link = xnext,
+                               extra_headers=validator_headers(etag))
+
+            elif role == "adopter":
+                claims = event['requestContext']['authorizer']['jwt']['claims']
+                deck = load_deck(claims)
+                limit = max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+
+                # Dogs swiped since the snapshot was built are out of both the total and the pages
+                unswiped = [i for i, dog_id in enumerate(deck['dog_ids']) if dog_id not in deck['swiped']]
+                count = len(unswiped)
+
+                # Resume at the x-next snapshot index, or fall back to page numbers over the unswiped dogs
+                cursor = decode_cursor(next_tok)
+                if cursor:
+                    start = bisect_left(unswiped, int(cursor['i']))
+                elif page:
+                    start = max(0, (int(page) - 1) * limit)
+                else:
+                    start = 0
+
+                indexes = unswiped[start:start + limit]
+                xnext = encode_cursor({'i': unswiped[start + limit]}) if start + limit < count else None
+
+                dogs = get_dogs(
+                    dynamo, [(deck['dog_ids'][i], deck['dog_created_ats'][i]) for i in indexes],
+                    attributes=CARD_ATTRIBUTES
+                )
+                page_dogs = []
+                for i, dog in zip(indexes, dogs):
+                    if dog and dog.get('dog_status') == 'AVAILABLE':
+                        dog['distance'] = deck['distances'][i]
+                        page_dogs.append(dog)
+
+                etag = page_etag(
+                    page_dogs, [dog['distance'] for dog in page_dogs], xnext, count
+                )
+                if not_modified(headers, etag):
+                    return not_modified_response(etag)
+
+                return respond(None, sanitise_output(page_dogs), next_link=xnext, count=count,
+                               extra_headers=validator_headers(etag))
 
             else:
                 return respond('Forbidden user', status_code='403')
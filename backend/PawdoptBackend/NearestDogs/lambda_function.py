@@ -1,32 +1,46 @@
 import boto3
-from math import radians, cos, sin, asin, sqrt
+import os
 import json
 import base64
-from boto3.dynamodb.conditions import Key, Attr
+import numpy as np
+from pawdopt_common.deck import candidate_distances, dog_distances, eligible_dogs
+from pawdopt_common.geo import top_k
+from pawdopt_common.log import get_logger, log_payload
+from pawdopt_common.nearby import find_nearby_dogs
+from pawdopt_common.pagination import decode_cursor, encode_cursor
+from pawdopt_common.projections import CARD_ATTRIBUTES, projection
+from pawdopt_common.scan import parallel_scan
+from pawdopt_common.shelter_locations import get_shelter_locations
+from pawdopt_common.swipes import excluded_directions, load_swiped_dog_ids
+from pawdopt_common.photo_variants import view_keys
+from pawdopt_common.signing import PhotoSigner
 
+logger = get_logger(__name__)
 
 # AWS clients
 dynamodb = boto3.resource('dynamodb')
 cognito = boto3.client('cognito-idp')
 s3 = boto3.client('s3', region_name='REGION') # Replace with your Region
+signer = PhotoSigner(s3)
 
 DOG_TABLE = "dog"  # DynamoDB dog table name
 USER_POOL_ID = "USERPOOLID"  # Cognito User Pool ID
 SWIPE_TABLE = "swipe"
 
+# Geohash index lookup: expand rings until enough candidates are found
+GEO_INDEX_NAME = os.environ.get("GEO_INDEX_NAME", "geohash-index")
+DECK_CANDIDATE_TARGET = int(os.environ.get("DECK_CANDIDATE_TARGET", "200"))
+MAX_SEARCH_RADIUS_KM = float(os.environ.get("MAX_SEARCH_RADIUS_KM", "100"))
+# Default and maximum number of cards per page; only these are signed
+DECK_SIZE = int(os.environ.get("DECK_SIZE", "100"))
+MAX_PAGE_SIZE = 100
+
 def sanitise_output(dog):
     # Change photo keys to photo urls
     if 'photo_key' in dog:
-        pk = dog['photo_key']
-        presigned_urls = []
-        for key in pk:
-            presigned_urls.append(s3.generate_presigned_url(
-                ClientMethod='get_object',
-                Params={'Bucket': 'DOG_BUCKET', 'Key': key}, # Replace with your Dog Bucket
-                ExpiresIn=3600
-            ))
-        dog['photoURLs'] = presigned_urls
+        dog['photoURLs'] = signer.sign_all(view_keys(dog, 'card'))
         del dog['photo_key']
+    dog.pop('photo_variants', None)
 
     dog['id'] = dog['dog_id']
     del dog['dog_id']
@@ -37,7 +51,7 @@ def sanitise_output(dog):
     dog['createdAt'] = dog['created_at']
     del dog['created_at']
 
-    dog['age'] = str(dog['age'])
+    dog['age'] = str(dog.get('age', ''))
 
     dog['distance'] = dog['distance_km']
     del dog['distance_km']
@@ -70,13 +84,13 @@ def decode_jwt_payload(token):
         
         return payload
     except Exception as e:
-        print(f"JWT decode error: {str(e)}")
+        logger.warning("JWT decode error: %s", e)
         return None
 
 def extract_user_id(event):
     """Extract user ID from various possible locations in the event"""
     
-    print(f"🔍 Event structure: {json.dumps(event, default=str, indent=2)}")
+    log_payload(logger, "🔍 Event structure", event)
     
     # Method 1: Try to get from API Gateway JWT authorizer claims
     try:
@@ -86,19 +100,19 @@ def extract_user_id(event):
         if "claims" in authorizer["jwt"]:
             user_id = authorizer["jwt"]["claims"].get("sub")
             if user_id:
-                print(f"✅ Found user ID in authorizer claims: {user_id}")
+                logger.debug("✅ Found user ID in authorizer claims: %s", user_id)
                 return user_id
         # JWT authorizer might put claims directly in authorizer
         if "sub" in authorizer:
             user_id = authorizer["sub"]
-            print(f"✅ Found user ID directly in authorizer: {user_id}")
+            logger.debug("✅ Found user ID directly in authorizer: %s", user_id)
             return user_id
             
-        print("❌ No claims found in authorizer")
-        print(f"Authorizer content: {authorizer}")
+        logger.info("❌ No claims found in authorizer")
+        logger.debug("Authorizer content: %s", authorizer)
         
     except Exception as e:
-        print(f"❌ Error accessing authorizer: {str(e)}")
+        logger.info("❌ Error accessing authorizer: %s", e)
     
     # Method 2: Extract directly from Authorization header (fallback)
     try:
@@ -106,57 +120,44 @@ def extract_user_id(event):
         auth_header = headers.get("Authorization") or headers.get("authorization")
         
         if not auth_header:
-            print("❌ No Authorization header found")
-            print(f"Available headers: {list(headers.keys())}")
+            logger.warning("❌ No Authorization header found")
+            logger.debug("Available headers: %s", list(headers.keys()))
             return None
             
-        print(f"🔍 Found Authorization header: {auth_header[:50]}...")
+        logger.debug("🔍 Found Authorization header")
         
         # Decode JWT payload
         payload = decode_jwt_payload(auth_header)
         
         if payload:
             user_id = payload.get('sub')
-            print(f"✅ Successfully decoded JWT, user ID: {user_id}")
-            print(f"Token payload: {json.dumps(payload, indent=2)}")
+            logger.debug("✅ Successfully decoded JWT, user ID: %s", user_id)
+            log_payload(logger, "Token payload", payload)
             return user_id
         else:
-            print("❌ Failed to decode JWT token")
+            logger.warning("❌ Failed to decode JWT token")
             return None
             
     except Exception as e:
-        print(f"❌ Error extracting from Authorization header: {str(e)}")
+        logger.warning("❌ Error extracting from Authorization header: %s", e)
         return None
 
-def haversine(lon1, lat1, lon2, lat2):
-    """Calculate the great circle distance in km between two points."""
-    try:
-        lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-        c = 2 * asin(sqrt(a))
-        r = 6371  # Earth radius in km
-        return c * r
-    except Exception as e:
-        print(f"Haversine calculation error: {str(e)}")
-        return 0
-
 def lambda_handler(event, context):
-    print("🐕 NearestDogs Lambda function started")
+    logger.debug("🐕 NearestDogs Lambda function started")
     
     # CORS headers for all responses
     cors_headers = {
         "Access-Control-Allow-Origin": "*",
         "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
         "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
+        "Access-Control-Expose-Headers": "x-next",
         "Access-Control-Max-Age": "3600"
     }
     
     try:
         # Handle preflight OPTIONS request
         if event.get("httpMethod") == "OPTIONS":
-            print("📋 Handling OPTIONS request")
+            logger.debug("📋 Handling OPTIONS request")
             return {
                 "statusCode": 200,
                 "headers": cors_headers,
@@ -167,7 +168,7 @@ def lambda_handler(event, context):
         adopter_id = extract_user_id(event)
         
         if not adopter_id:
-            print("❌ Failed to extract user ID from any source")
+            logger.warning("❌ Failed to extract user ID from any source")
             return {
                 "statusCode": 401,
                 "headers": cors_headers,
@@ -181,7 +182,21 @@ def lambda_handler(event, context):
                 })
             }
 
-        print(f"✅ Using adopter ID: {adopter_id}")
+        logger.info("✅ Using adopter ID: %s", adopter_id)
+
+        # Page size and the opaque cursor of the last card on the previous page
+        params = event.get("queryStringParameters") or {}
+        try:
+            limit = max(1, min(int(params.get("limit") or DECK_SIZE), MAX_PAGE_SIZE))
+            cursor = decode_cursor(params.get("cursor"))
+            if cursor is not None and not (isinstance(cursor, dict) and "d" in cursor and "id" in cursor):
+                raise ValueError("Invalid cursor")
+        except ValueError as e:
+            return {
+                "statusCode": 400,
+                "headers": cors_headers,
+                "body": json.dumps({"error": f"Invalid limit or cursor: {str(e)}"})
+            }
 
         # 2️⃣ Get adopter's lat/lon from Cognito (with fallback for permissions issues)
         adopter_lat, adopter_lon = 51.5074, -0.1278  # Default to London coordinates
@@ -192,40 +207,57 @@ def lambda_handler(event, context):
             adopter_lat = float(attrs.get("custom:latitude", 51.5074))
             adopter_lon = float(attrs.get("custom:longitude", -0.1278))
             
-            print(f"📍 Adopter location from Cognito: lat={adopter_lat}, lon={adopter_lon}")
+            logger.debug("📍 Adopter location from Cognito: lat=%s, lon=%s", adopter_lat, adopter_lon)
         except Exception as e:
-            print(f"⚠️ Using default location due to Cognito error: {str(e)}")
-            print(f"📍 Using default London coordinates: lat={adopter_lat}, lon={adopter_lon}")
+            logger.warning("⚠️ Using default London coordinates due to Cognito error: %s", e)
 
-        # 3️⃣ Get all dogs from DynamoDB
+        # 3️⃣ Swipes that hide a dog from this adopter
+        swiped_dog_ids = load_swiped_dog_ids(
+            dynamodb.meta.client, adopter_id, excluded_directions(), table_name=SWIPE_TABLE
+        )
+        logger.info("👆 Adopter has %d excluded swipes", len(swiped_dog_ids))
+
+        # 4️⃣ Get nearby dogs from the geohash index, falling back to a full scan.
+        # Only dogs inside the covered radius come back, so no unqueried ring
+        # can hold a dog nearer than the ones ranked below.
         try:
-            dog_table = dynamodb.Table(DOG_TABLE)
-            response = dog_table.scan()
-            dogs_data = response.get("Items", [])
-            
-            print(f"🐕 DynamoDB scan response: {response}")
-            print(f"🐕 Found {len(dogs_data)} dogs in database")
+            dogs_data, radius_km = find_nearby_dogs(
+                dynamodb.meta.client, DOG_TABLE, adopter_lat, adopter_lon,
+                # One more than the page, so a full page knows whether more follow
+                target=max(DECK_CANDIDATE_TARGET, limit + 1),
+                max_radius_km=MAX_SEARCH_RADIUS_KM,
+                min_radius_km=cursor["d"] if cursor else 0,
+                index_name=GEO_INDEX_NAME,
+                measure=candidate_distances(
+                    dynamodb.meta.client, adopter_lat, adopter_lon, swiped_dog_ids,
+                    cognito=cognito, user_pool_id=USER_POOL_ID,
+                    after=(cursor["d"], cursor["id"]) if cursor else None
+                )
+            )
+            logger.info("🐕 Found %d dogs within %.0fkm", len(dogs_data), radius_km)
+
+            if not dogs_data:
+                logger.info("📋 No dogs found near adopter - scanning whole table")
+                dogs_data = list(parallel_scan(
+                    dynamodb.meta.client, DOG_TABLE, **projection(CARD_ATTRIBUTES)
+                ))
+                logger.info("🐕 Found %d dogs in database", len(dogs_data))
             
             if not dogs_data:
-                print("📋 No dogs found in database - returning empty array")
+                logger.info("📋 No dogs found in database - returning empty array")
                 return {
                     "statusCode": 200,
                     "headers": cors_headers,
                     "body": json.dumps({"dogs": []})
                 }
 
-            # Log each dog for debugging
-            for i, dog in enumerate(dogs_data):
-                print(f"🐕 Dog {i+1}: {dog}")
-                
+            log_payload(logger, "🐕 Candidate dogs", dogs_data)
+
         except Exception as e:
-            print(f"❌ Error accessing DynamoDB: {str(e)}")
-            print(f"❌ DynamoDB error type: {type(e).__name__}")
-            import traceback
-            print(f"❌ DynamoDB traceback: {traceback.format_exc()}")
-            
+            logger.exception("❌ Error accessing DynamoDB (%s): %s", type(e).__name__, e)
+
             # Only use mock data if there's a real DynamoDB error
-            print("🧪 Using mock data due to DynamoDB error")
+            logger.warning("🧪 Using mock data due to DynamoDB error")
             dogs_data = [
                 {
                     "id": "test-dog-1",
@@ -249,82 +281,55 @@ def lambda_handler(event, context):
                 }
             ]
 
-        # 4️⃣ Group dogs by shelter_id
-        dogs_by_shelter = {}
-        for dog in dogs_data:
-            shelter_id = dog.get("shelter_id")
-            if shelter_id:
-                dogs_by_shelter.setdefault(shelter_id, []).append(dog)
-
-        print(f"🏠 Found dogs from {len(dogs_by_shelter)} shelters")
-
-        # 5️⃣ Get shelter lat/lon from Cognito (with fallbacks for permissions issues)
-        shelter_locations = {}
-        for shelter_id in dogs_by_shelter.keys():
-            try:
-                shelter_user = cognito.admin_get_user(UserPoolId=USER_POOL_ID, Username=shelter_id)
-                s_attrs = {a["Name"]: a["Value"] for a in shelter_user["UserAttributes"]}
-                shelter_lat = float(s_attrs.get("custom:latitude", 51.5074))
-                shelter_lon = float(s_attrs.get("custom:longitude", -0.1278))
-                shelter_locations[shelter_id] = (shelter_lat, shelter_lon)
-                print(f"📍 Shelter {shelter_id} from Cognito: lat={shelter_lat}, lon={shelter_lon}")
-            except Exception as e:
-                print(f"⚠️ Using default coordinates for shelter {shelter_id} due to error: {str(e)}")
-                # Use varied default coordinates around London for testing
-                if shelter_id == "test-shelter-1":
-                    shelter_locations[shelter_id] = (51.5074, -0.1278)  # London center
-                elif shelter_id == "test-shelter-2":
-                    shelter_locations[shelter_id] = (51.5155, -0.0922)  # London east
-                else:
-                    shelter_locations[shelter_id] = (51.4994, -0.1270)  # London south
-                
-                shelter_lat, shelter_lon = shelter_locations[shelter_id]
-                print(f"📍 Using default coordinates for {shelter_id}: lat={shelter_lat}, lon={shelter_lon}")
-
-        # 6️⃣ Attach distances to dogs and ensure required fields
+        # 5️⃣ Keep available dogs the adopter hasn't already swiped
+        eligible = eligible_dogs(dogs_data, swiped_dog_ids)
+
+        # 6️⃣ Get shelter lat/lon from the warm cache / shelter_location projection
+        shelter_locations = get_shelter_locations(
+            dynamodb.meta.client, [dog["shelter_id"] for dog in eligible],
+            cognito=cognito, user_pool_id=USER_POOL_ID
+        )
+        logger.info("🏠 Found %d eligible dogs from %d shelters", len(eligible), len(shelter_locations))
+
+        # 7️⃣ Distance to every shelter in one call, then pick the k nearest dogs
+        distances = dog_distances(eligible, adopter_lat, adopter_lon, shelter_locations)
+        dog_ids = np.array([dog["dog_id"] for dog in eligible], dtype=str)
+
+        # Order is (distance, dog_id), so resume strictly after the cursor
+        if cursor:
+            after = (distances > cursor["d"]) | ((distances == cursor["d"]) & (dog_ids > cursor["id"]))
+            remaining = np.flatnonzero(after)
+        else:
+            remaining = np.arange(len(eligible))
+
+        page = remaining[top_k(distances[remaining], limit, tiebreak=dog_ids[remaining])]
+
+        next_cursor = None
+        if len(remaining) > len(page):
+            last = page[-1]
+            next_cursor = encode_cursor({"d": float(distances[last]), "id": str(dog_ids[last])})
+
         dogs_with_distance = []
-        for shelter_id, dogs in dogs_by_shelter.items():
-            shelter_lat, shelter_lon = shelter_locations[shelter_id]
-            distance_km = haversine(adopter_lon, adopter_lat, shelter_lon, shelter_lat)
-            for dog in dogs:
-                dog["distance_km"] = round(distance_km, 2)
-                
-                print('dog before: ', dog)
-                dog = sanitise_output(dog)
-
-                # # Ensure required fields exist for React Native app
-                # if not dog.get("photoUrl"):
-                #     # Generate placeholder URL if no photoUrl in database
-                #     dog_name = dog.get("name", "Dog").replace(" ", "+")
-                #     dog["photoUrl"] = f"https://placehold.co/600x400/FFD194/FFF?text={dog_name}"
-                print('dog after: ', dog)
-
-                swipe_table = dynamodb.Table(SWIPE_TABLE)
-                r = swipe_table.query(
-                    KeyConditionExpression=Key('adopter_id').eq(adopter_id),
-                    FilterExpression=Attr('dog_id').eq(dog['id']) &
-                                    Attr('direction').eq('right')
-                )['Items']
-                status = dog.get("dog_status")
-                if not r and status == 'AVAILABLE':
-                    dogs_with_distance.append(dog)
-
-        # 7️⃣ Sort by distance
-        dogs_with_distance.sort(key=lambda d: d.get("distance_km", 0))
-        
-        print(f"✅ Returning {len(dogs_with_distance)} dogs sorted by distance")
-        print(dogs_with_distance)
+        for i in page:
+            dog = eligible[i]
+            dog["distance_km"] = float(distances[i])
+            dogs_with_distance.append(sanitise_output(dog))
+
+        logger.info("✅ Returning %d of %d remaining dogs sorted by distance", len(dogs_with_distance), len(remaining))
+        log_payload(logger, "Deck page", dogs_with_distance)
+
+        headers = dict(cors_headers)
+        if next_cursor:
+            headers["x-next"] = next_cursor
 
         return {
             "statusCode": 200,
-            "headers": cors_headers,
+            "headers": headers,
             "body": json.dumps({"dogs": dogs_with_distance})
         }
         
     except Exception as e:
-        print(f"❌ Unexpected error in lambda function: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("❌ Unexpected error in lambda function: %s", e)
         
         return {
             "statusCode": 500,
@@ -0,0 +1,47 @@
+"""
+Compare the scalar haversine + full sort deck ranking with the vectorised
+haversine_many + top_k path.
+
+Run from PawdoptCommonLayer: python benchmarks/bench_distance.py [n_shelters] [k]
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+from pawdopt_common.geo import haversine, haversine_many, top_k  # noqa: E402
+
+ADOPTER = (51.5074, -0.1278)
+
+
+def scalar_path(lats, lons, k):
+    distances = [haversine(ADOPTER[1], ADOPTER[0], lon, lat) for lat, lon in zip(lats, lons)]
+    return sorted(range(len(distances)), key=distances.__getitem__)[:k]
+
+
+def vector_path(lats, lons, k):
+    return top_k(haversine_many(ADOPTER[0], ADOPTER[1], lats, lons), k)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    rng = random.Random(42)
+    lats = [rng.uniform(49.9, 58.6) for _ in range(n)]
+    lons = [rng.uniform(-6.4, 1.8) for _ in range(n)]
+
+    assert list(scalar_path(lats, lons, k)) == list(vector_path(lats, lons, k))
+
+    runs = 20
+    scalar = timeit.timeit(lambda: scalar_path(lats, lons, k), number=runs) / runs
+    vector = timeit.timeit(lambda: vector_path(lats, lons, k), number=runs) / runs
+    print(f"n={n} k={k}")
+    print(f"scalar haversine + sort:      {scalar * 1000:8.2f} ms")
+    print(f"haversine_many + top_k:       {vector * 1000:8.2f} ms")
+    print(f"speedup:                      {scalar / vector:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Measure presigning throughput: a fresh generate_presigned_url per key versus
+one PhotoSigner reused across requests, for a screen of avatars.
+
+Signing is local (no network), so dummy credentials are enough.
+
+Run from PawdoptCommonLayer: python benchmarks/bench_signing.py [keys] [screens]
+"""
+import os
+import sys
+import timeit
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+from pawdopt_common.signing import PhotoSigner  # noqa: E402
+
+BUCKET = 'bench-bucket'
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    screens = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    s3 = boto3.client(
+        's3', region_name='eu-west-2',
+        aws_access_key_id='AKIDEXAMPLE', aws_secret_access_key='secret'
+    )
+    keys = [f'user-{i}/icon.jpg' for i in range(n)]
+    signer = PhotoSigner(s3, bucket=BUCKET)
+
+    def raw():
+        for key in keys:
+            s3.generate_presigned_url('get_object', Params={'Bucket': BUCKET, 'Key': key}, ExpiresIn=3600)
+
+    def batched():
+        signer.sign_all(keys)
+
+    def uploads():
+        for key in keys:
+            signer.sign_upload(key, 'image/jpeg')
+
+    raw_t = timeit.timeit(raw, number=screens) / screens
+    batched_t = timeit.timeit(batched, number=screens) / screens
+    upload_t = timeit.timeit(uploads, number=screens) / screens
+    print(f"keys per screen={n} screens={screens}")
+    print(f"get, signed per key:        {raw_t * 1000:8.2f} ms/screen  {n / raw_t:10.0f} urls/s")
+    print(f"get, shared PhotoSigner:    {batched_t * 1000:8.2f} ms/screen  {n / batched_t:10.0f} urls/s")
+    print(f"put, shared PhotoSigner:    {upload_t * 1000:8.2f} ms/screen  {n / upload_t:10.0f} urls/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Fire parallel chat accepts for one adopter/shelter pair and count lost dogs.
+
+Compares upsert_chat (a dog ownership read, a pair index lookup and one
+list_append UpdateItem) against the old read-modify-write of the dog lists.
+Needs a `chat` table with partition key `chat_id` and the
+`adopter_id-shelter_id-index` GSI, and a `dog` table keyed on
+(dog_id, created_at), where the run's dogs are written first; set
+DYNAMODB_ENDPOINT_URL to point at DynamoDB Local.
+
+Run from PawdoptCommonLayer: python benchmarks/load_accept_chat.py [accepts] [threads]
+"""
+import os
+import sys
+import time
+import uuid
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+from pawdopt_common.chats import CHAT_TABLE, DOG_TABLE, chat_id_for, upsert_chat  # noqa: E402
+from pawdopt_common.dynamo_batch import batch_delete, batch_write  # noqa: E402
+
+TABLE = os.environ.get('CHAT_TABLE', CHAT_TABLE)
+DOGS = os.environ.get('DOG_TABLE', DOG_TABLE)
+CREATED_AT = '2025-01-01T00:00:00'
+
+
+def read_modify_write(client, adopter_id, shelter_id, dog_id, dog_created_at):
+    """The previous accept path: read the lists, append in Python, write them back."""
+    key = {'chat_id': {'S': chat_id_for(adopter_id, shelter_id)}}
+    item = client.get_item(TableName=TABLE, Key=key).get('Item')
+    dog_ids = item['dog_ids']['L'] if item else []
+    dog_created_ats = item['dog_created_ats']['L'] if item else []
+    client.put_item(TableName=TABLE, Item={
+        **key,
+        'adopter_id': {'S': adopter_id},
+        'shelter_id': {'S': shelter_id},
+        'dog_ids': {'L': dog_ids + [{'S': dog_id}]},
+        'dog_created_ats': {'L': dog_created_ats + [{'S': dog_created_at}]},
+    })
+
+
+def run(client, accept, accepts, threads):
+    adopter_id, shelter_id = f'load-adopter-{uuid.uuid4()}', f'load-shelter-{uuid.uuid4()}'
+    dogs = [f'dog-{i}' for i in range(accepts)]
+    dog_keys = [{'dog_id': {'S': dog_id}, 'created_at': {'S': CREATED_AT}} for dog_id in dogs]
+    batch_write(client, [(DOGS, dict(key, shelter_id={'S': shelter_id})) for key in dog_keys])
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda dog_id: accept(client, adopter_id, shelter_id, dog_id, CREATED_AT), dogs))
+    elapsed = time.perf_counter() - started
+    batch_delete(client, DOGS, dog_keys)
+
+    key = {'chat_id': {'S': chat_id_for(adopter_id, shelter_id)}}
+    item = client.get_item(TableName=TABLE, Key=key, ConsistentRead=True)['Item']
+    stored = [d['S'] for d in item['dog_ids']['L']]
+    client.delete_item(TableName=TABLE, Key=key)
+    return len(set(dogs) - set(stored)), len(stored) - len(set(stored)), elapsed
+
+
+def main():
+    accepts = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    client = boto3.client('dynamodb', endpoint_url=os.environ.get('DYNAMODB_ENDPOINT_URL'))
+
+    print(f"accepts={accepts} threads={threads} table={TABLE}")
+    for label, accept in (('read-modify-write', read_modify_write),
+                          ('upsert_chat', partial(upsert_chat, table_name=TABLE, dog_table=DOGS))):
+        lost, duplicated, elapsed = run(client, accept, accepts, threads)
+        print(f"{label:18} lost={lost:5d} duplicated={duplicated:5d} "
+              f"{elapsed:6.2f}s ({accepts / elapsed:7.1f} accepts/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Helpers shared by the Pawdopt Python Lambda functions (deployed as a layer)."""
@@ -0,0 +1,111 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from pawdopt_common.dynamo_batch import batch_delete
+from pawdopt_common.log import get_logger
+from pawdopt_common.projections import projection
+
+logger = get_logger(__name__)
+
+DOG_ID_INDEX = 'dog_id-index'
+S3_DELETE_LIMIT = 1000
+CASCADE_PAGE_SIZE = int(os.environ.get('CASCADE_PAGE_SIZE', '500'))
+
+# Tables holding items that reference a dog, with their base-table key names
+RELATED_TABLES = {
+    'chat': ('chat_id',),
+    'request': ('request_id', 'created_at'),
+    'swipe': ('adopter_id', 'swiped_at'),
+}
+
+
+def related_key_pages(client, table_name, dog_id, key_names, start_key=None,
+                      index_name=DOG_ID_INDEX, page_size=CASCADE_PAGE_SIZE):
+    """
+    Yield (keys, last_evaluated_key) for each page of items referencing a dog.
+
+    Follows LastEvaluatedKey on the dog_id GSI until the end, reading only
+    the base-table key attributes. The last page has last_evaluated_key None;
+    passing a yielded key back as `start_key` resumes after that page.
+    """
+    query_kwargs = {
+        'TableName': table_name,
+        'IndexName': index_name,
+        'KeyConditionExpression': 'dog_id = :dog_id',
+        'ExpressionAttributeValues': {':dog_id': {'S': dog_id}},
+        'Limit': page_size,
+        **projection(list(key_names)),
+    }
+    if start_key:
+        query_kwargs['ExclusiveStartKey'] = start_key
+    while True:
+        response = client.query(**query_kwargs)
+        keys = [{name: item[name] for name in key_names} for item in response.get('Items', [])]
+        last_key = response.get('LastEvaluatedKey')
+        yield keys, last_key
+        if not last_key:
+            return
+        query_kwargs['ExclusiveStartKey'] = last_key
+
+
+
+def delete_related(client, table_name, dog_id, key_names, start_key=None, after_page=None):
+    """
+    Delete every item in `table_name` that references the dog, page by page.
+
+    `after_page(last_key)` is called once each page is deleted, with None
+    after the last page; a true return stops there. Returns the number of
+    items deleted.
+    """
+    deleted = 0
+    for keys, last_key in related_key_pages(client, table_name, dog_id, key_names, start_key=start_key):
+        if keys:
+            batch_delete(client, table_name, keys)
+            deleted += len(keys)
+        if after_page and after_page(last_key):
+            break
+    return deleted
+
+
+def delete_photos(s3, bucket, keys):
+    """Delete S3 objects in 1000-key delete_objects calls. Returns the keys that failed."""
+    failed = []
+    for i in range(0, len(keys), S3_DELETE_LIMIT):
+        chunk = keys[i:i + S3_DELETE_LIMIT]
+        response = s3.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in chunk], 'Quiet': True}
+        )
+        for error in response.get('Errors', []):
+            logger.warning('Could not delete s3://%s/%s: %s', bucket, error.get('Key'), error.get('Message'))
+            failed.append(error.get('Key'))
+    return failed
+
+
+def cascade_delete(client, s3, dog_id, photo_keys, bucket, tables=RELATED_TABLES,
+                   start_keys=None, after_page=None):
+    """
+    Remove everything that belongs to a deleted dog.
+
+    Each related table and the photo deletion run on their own thread, so a
+    dog's total cleanup time is that of its largest table rather than the
+    sum. `start_keys` resumes tables mid-way and `after_page(table_name,
+    last_key)` is passed on to `delete_related`. Returns
+    ({table_name: items_deleted}, failed_photo_keys). `client` must be a
+    low-level DynamoDB client.
+    """
+    start_keys = start_keys or {}
+    with ThreadPoolExecutor(max_workers=len(tables) + 1) as pool:
+        photos = pool.submit(delete_photos, s3, bucket, list(photo_keys or []))
+        counts = {
+            table_name: pool.submit(
+                delete_related, client, table_name, dog_id, key_names,
+                start_keys.get(table_name),
+                after_page and (lambda last_key, table_name=table_name: after_page(table_name, last_key))
+            )
+            for table_name, key_names in tables.items()
+        }
+        counts = {table_name: future.result() for table_name, future in counts.items()}
+        failed = photos.result()
+    logger.info('Cascade delete for dog %s: %s, %d photos failed', dog_id, counts, len(failed))
+    return counts, failed
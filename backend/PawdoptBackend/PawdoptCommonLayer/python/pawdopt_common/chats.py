@@ -0,0 +1,112 @@
+import uuid
+from datetime import datetime
+
+from boto3.dynamodb.types import TypeDeserializer
+
+CHAT_TABLE = 'chat'
+DOG_TABLE = 'dog'
+# GSI on chat: partition key adopter_id, sort key shelter_id
+CHAT_PAIR_INDEX = 'adopter_id-shelter_id-index'
+# Fixed namespace so every function derives the same chat id for a pair
+CHAT_NAMESPACE = uuid.UUID('5b0c7a52-8f8e-4c1e-9d55-2f4a6f0d7c31')
+
+deserialiser = TypeDeserializer()
+
+
+def chat_id_for(adopter_id, shelter_id):
+    """Deterministic chat id for an (adopter, shelter) pair."""
+    return str(uuid.uuid5(CHAT_NAMESPACE, f'{adopter_id}#{shelter_id}'))
+
+
+class DogNotOwned(Exception):
+    """The dog doesn't exist or belongs to another shelter."""
+
+
+def check_dog_owner(client, dog_id, dog_created_at, shelter_id, dog_table=DOG_TABLE):
+    """Raise DogNotOwned unless the dog exists and belongs to `shelter_id`."""
+    item = client.get_item(
+        TableName=dog_table,
+        Key={'dog_id': {'S': dog_id}, 'created_at': {'S': dog_created_at}},
+        ProjectionExpression='shelter_id',
+        ConsistentRead=True
+    ).get('Item')
+    if not item or item.get('shelter_id', {}).get('S') != shelter_id:
+        raise DogNotOwned(f'Dog {dog_id} does not belong to shelter {shelter_id}')
+
+
+def existing_chat(client, adopter_id, shelter_id, table_name=CHAT_TABLE, index_name=CHAT_PAIR_INDEX):
+    """
+    The pair's chat as stored: its chat_id and, for chats created before
+    dog lists, its single dog_id. Chats made by chatCRUD have random ids,
+    so the pair index is read rather than the derived id alone; the
+    derived chat wins when both exist. Returns None for a new pair.
+    """
+    items = client.query(
+        TableName=table_name,
+        IndexName=index_name,
+        KeyConditionExpression='adopter_id = :adopter_id AND shelter_id = :shelter_id',
+        ExpressionAttributeValues={':adopter_id': {'S': adopter_id}, ':shelter_id': {'S': shelter_id}},
+    ).get('Items', [])
+    if not items:
+        return None
+    derived = chat_id_for(adopter_id, shelter_id)
+    items.sort(key=lambda item: (item['chat_id']['S'] != derived, item.get('created_at', {}).get('S', '')))
+    return items[0]
+
+
+def upsert_chat(client, adopter_id, shelter_id, dog_id, dog_created_at, table_name=CHAT_TABLE,
+                dog_table=DOG_TABLE, index_name=CHAT_PAIR_INDEX):
+    """
+    Create the pair's chat or add a dog to it, in one UpdateItem.
+
+    The dog is first checked to belong to `shelter_id` (DogNotOwned
+    otherwise). The pair keeps the chat it already has, so older chats
+    with random ids are extended rather than duplicated; a new pair gets
+    the derived chat id. list_append over if_not_exists creates the lists
+    on first use (seeded with an older chat's single dog), so concurrent
+    accepts for the same pair land in one chat and none of their dogs are
+    lost. A new chat starts active; an existing chat keeps its status, so
+    one that was closed when its dog was adopted elsewhere stays closed.
+    A dog already in the chat fails the condition and the chat is
+    returned unchanged. Returns the chat as a plain dict.
+    """
+    check_dog_owner(client, dog_id, dog_created_at, shelter_id, dog_table)
+
+    current = existing_chat(client, adopter_id, shelter_id, table_name, index_name)
+    chat_id = current['chat_id']['S'] if current else chat_id_for(adopter_id, shelter_id)
+    seed_ids, seed_created_ats = [], []
+    if current and 'dog_ids' not in current and 'dog_id' in current:
+        seed_ids = [current['dog_id']]
+        seed_created_ats = [current.get('dog_created_at', {'S': ''})]
+
+    try:
+        response = client.update_item(
+            TableName=table_name,
+            Key={'chat_id': {'S': chat_id}},
+            UpdateExpression=(
+                'SET adopter_id = :adopter_id, shelter_id = :shelter_id,'
+                ' #status = if_not_exists(#status, :active),'
+                ' created_at = if_not_exists(created_at, :now),'
+                ' dog_ids = list_append(if_not_exists(dog_ids, :seed_ids), :dog_ids),'
+                ' dog_created_ats = list_append(if_not_exists(dog_created_ats, :seed_created_ats), :dog_created_ats)'
+            ),
+            ConditionExpression='NOT contains(dog_ids, :dog_id) AND NOT dog_id = :dog_id',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':adopter_id': {'S': adopter_id},
+                ':shelter_id': {'S': shelter_id},
+                ':active': {'S': 'active'},
+                ':now': {'S': datetime.utcnow().isoformat()},
+                ':seed_ids': {'L': seed_ids},
+                ':seed_created_ats': {'L': seed_created_ats},
+                ':dog_id': {'S': dog_id},
+                ':dog_ids': {'L': [{'S': dog_id}]},
+                ':dog_created_ats': {'L': [{'S': dog_created_at}]},
+            },
+            ReturnValues='ALL_NEW',
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+        item = response['Attributes']
+    except client.exceptions.ConditionalCheckFailedException as e:
+        item = e.response['Item']
+    return {k: deserialiser.deserialize(v) for k, v in item.items()}
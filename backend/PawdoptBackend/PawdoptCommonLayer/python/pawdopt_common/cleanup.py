@@ -0,0 +1,226 @@
+import json
+import os
+from collections import deque
+from datetime import datetime
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from pawdopt_common.cascade import RELATED_TABLES, cascade_delete
+from pawdopt_common.log import get_logger
+
+logger = get_logger(__name__)
+
+CLEANUP_JOB_TABLE = os.environ.get('CLEANUP_JOB_TABLE', 'dog_cleanup_job')
+CLEANUP_QUEUE = os.environ.get('CLEANUP_QUEUE', 'sqs')  # sqs or local
+CLEANUP_QUEUE_URL = os.environ.get('CLEANUP_QUEUE_URL', '')
+
+PENDING = 'pending'
+DONE = 'done'
+ABORTED = 'aborted'
+
+deserialiser = TypeDeserializer()
+
+
+class SqsQueue:
+    """Cleanup queue backed by SQS; DogCleanupWorker is subscribed to it."""
+
+    def __init__(self, sqs, queue_url):
+        self.sqs = sqs
+        self.queue_url = queue_url
+
+    def send(self, message):
+        self.sqs.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(message))
+
+
+class LocalQueue:
+    """In-process stand-in for SQS, for running the delete flow locally."""
+
+    def __init__(self):
+        self.messages = deque()
+
+    def send(self, message):
+        self.messages.append(json.loads(json.dumps(message)))
+
+    def drain(self, handler):
+        """Pass queued messages to `handler` until the queue is empty."""
+        while self.messages:
+            handler(self.messages.popleft())
+
+
+def get_queue(sqs=None, kind=None):
+    """
+    Build the queue named by CLEANUP_QUEUE (or `kind`).
+
+    A LocalQueue is only used when asked for. Without CLEANUP_QUEUE_URL
+    the SQS queue raises, so a deployed function fails loudly instead of
+    queueing jobs in memory where no worker will see them.
+    """
+    kind = kind or CLEANUP_QUEUE
+    if kind == 'local':
+        return LocalQueue()
+    if kind != 'sqs':
+        raise ValueError(f'Unknown cleanup queue {kind}')
+    if not CLEANUP_QUEUE_URL:
+        logger.error(
+            'CLEANUP_QUEUE_URL is not set for %s',
+            os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'this process')
+        )
+        raise ValueError('CLEANUP_QUEUE_URL is not set; use CLEANUP_QUEUE=local to run locally')
+    if sqs is None:
+        import boto3
+        sqs = boto3.client('sqs')
+    return SqsQueue(sqs, CLEANUP_QUEUE_URL)
+
+
+def job_item(dog_id, dog_created_at, photo_keys, bucket, tables=RELATED_TABLES):
+    """Low-level item for a new cleanup job, with an empty checkpoint per table."""
+    now = datetime.utcnow().isoformat()
+    return {
+        'dog_id': {'S': dog_id},
+        'dog_created_at': {'S': dog_created_at},
+        'status': {'S': PENDING},
+        'bucket': {'S': bucket},
+        'photo_keys': {'L': [{'S': key} for key in photo_keys]},
+        'photos_done': {'BOOL': not photo_keys},
+        'checkpoints': {'M': {table_name: {'S': ''} for table_name in tables}},
+        'created_at': {'S': now},
+        'updated_at': {'S': now},
+    }
+
+
+def delete_dog_with_job(client, dog_id, dog_created_at, shelter_id, photo_keys, bucket,
+                        dog_table='dog'):
+    """
+    Delete a dog and record its cleanup job in one transaction.
+
+    The dog delete is conditioned on the dog still existing under
+    `shelter_id`, so a job only ever exists for a dog that is really gone,
+    and the job put on no job existing yet. Raises the client's
+    TransactionCanceledException when a condition fails; see
+    `delete_cancellation_status`.
+    """
+    client.transact_write_items(TransactItems=[
+        {
+            'Put': {
+                'TableName': CLEANUP_JOB_TABLE,
+                'Item': job_item(dog_id, dog_created_at, photo_keys, bucket),
+                'ConditionExpression': 'attribute_not_exists(dog_id)',
+            }
+        },
+        {
+            'Delete': {
+                'TableName': dog_table,
+                'Key': {'dog_id': {'S': dog_id}, 'created_at': {'S': dog_created_at}},
+                'ConditionExpression': 'shelter_id = :shelter_id',
+                'ExpressionAttributeValues': {':shelter_id': {'S': shelter_id}},
+                'ReturnValuesOnConditionCheckFailure': 'ALL_OLD',
+            }
+        },
+    ])
+
+
+def delete_cancellation_status(error):
+    """Map a cancelled `delete_dog_with_job` transaction to (message, status code)."""
+    reasons = error.response.get('CancellationReasons', [])
+    codes = [r.get('Code') for r in reasons]
+    if len(codes) > 1 and codes[1] == 'ConditionalCheckFailed':
+        if reasons[1].get('Item'):
+            return 'Forbidden user', 403
+        return 'Dog not found', 404
+    if codes and codes[0] == 'ConditionalCheckFailed':
+        return 'Dog is already being deleted', 409
+    if 'TransactionConflict' in codes:
+        return 'Delete conflicted with another write, please retry', 409
+    return f'Dog not deleted: {codes}', 500
+
+
+def dog_exists(client, dog_id, dog_table='dog'):
+    items = client.query(
+        TableName=dog_table,
+        KeyConditionExpression='dog_id = :dog_id',
+        ExpressionAttributeValues={':dog_id': {'S': dog_id}},
+        ProjectionExpression='dog_id',
+        ConsistentRead=True,
+        Limit=1
+    ).get('Items', [])
+    return bool(items)
+
+
+def load_job(client, dog_id):
+    item = client.get_item(
+        TableName=CLEANUP_JOB_TABLE, Key={'dog_id': {'S': dog_id}}, ConsistentRead=True
+    ).get('Item')
+    return {k: deserialiser.deserialize(v) for k, v in item.items()} if item else None
+
+
+def _save(client, dog_id, update_expression, names, values):
+    """Apply one SET to the job record and bump its updated_at."""
+    update_kwargs = {
+        'TableName': CLEANUP_JOB_TABLE,
+        'Key': {'dog_id': {'S': dog_id}},
+        'UpdateExpression': update_expression + ', updated_at = :now',
+        'ExpressionAttributeValues': dict(values, **{':now': {'S': datetime.utcnow().isoformat()}}),
+    }
+    if names:
+        update_kwargs['ExpressionAttributeNames'] = names
+    client.update_item(**update_kwargs)
+
+
+def run_job(client, s3, dog_id, should_stop=None, tables=RELATED_TABLES):
+    """
+    Work through a dog's cleanup job from its checkpoints.
+
+    Runs `cascade_delete` over the unfinished tables, each resuming after
+    its last deleted page, and over the photos unless they are done. The
+    position is saved after every page, and `should_stop` is polled there
+    so the caller can stop before a time limit. Returns True when the job
+    is complete (or no longer exists), False if it stopped early. A job
+    whose dog still exists is aborted without deleting anything.
+    """
+    should_stop = should_stop or (lambda: False)
+    job = load_job(client, dog_id)
+    if not job or job['status'] != PENDING:
+        return True
+
+    # Never strip the history of a dog that is still live
+    if dog_exists(client, dog_id):
+        logger.warning('Dog %s still exists; aborting its cleanup job', dog_id)
+        _save(client, dog_id, 'SET #status = :aborted', {'#status': 'status'}, {':aborted': {'S': ABORTED}})
+        return True
+
+    checkpoints = job.get('checkpoints', {})
+    pending = {
+        table_name: key_names for table_name, key_names in tables.items()
+        if checkpoints.get(table_name) != DONE
+    }
+    stopped = set()
+
+    def after_page(table_name, last_key):
+        _save(
+            client, dog_id, 'SET checkpoints.#table = :checkpoint',
+            {'#table': table_name},
+            {':checkpoint': {'S': json.dumps(last_key) if last_key else DONE}},
+        )
+        if last_key and should_stop():
+            stopped.add(table_name)
+            return True
+        return False
+
+    photo_keys = [] if job.get('photos_done') else job.get('photo_keys', [])
+    _, failed = cascade_delete(
+        client, s3, dog_id, photo_keys, job['bucket'], tables=pending,
+        start_keys={t: json.loads(checkpoints[t]) for t in pending if checkpoints.get(t)},
+        after_page=after_page,
+    )
+    if failed:
+        logger.warning('Dog %s cleanup left %d photos behind', dog_id, len(failed))
+    if photo_keys:
+        _save(client, dog_id, 'SET photos_done = :done', None, {':done': {'BOOL': True}})
+
+    finished = not stopped
+    if finished:
+        _save(client, dog_id, 'SET #status = :done', {'#status': 'status'}, {':done': {'S': DONE}})
+        logger.info('Cleanup for dog %s complete', dog_id)
+    else:
+        logger.info('Cleanup for dog %s paused at a checkpoint', dog_id)
+    return finished
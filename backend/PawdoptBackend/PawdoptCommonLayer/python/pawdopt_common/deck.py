@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+
+from pawdopt_common.geo import haversine_many, top_k
+from pawdopt_common.nearby import find_nearby_dogs
+from pawdopt_common.projections import RANKING_ATTRIBUTES, projection
+from pawdopt_common.scan import parallel_scan
+from pawdopt_common.shelter_locations import get_shelter_locations
+from pawdopt_common.swipes import excluded_directions, load_swiped_dog_ids
+
+MAX_DECK_SIZE = int(os.environ.get('MAX_DECK_SIZE', '1000'))
+MAX_SEARCH_RADIUS_KM = float(os.environ.get('MAX_SEARCH_RADIUS_KM', '100'))
+
+
+def is_eligible(dog, swiped_dog_ids):
+    return bool(
+        dog.get('shelter_id')
+        and dog.get('dog_status') == 'AVAILABLE'
+        and dog.get('dog_id') not in swiped_dog_ids
+    )
+
+
+def eligible_dogs(dogs, swiped_dog_ids):
+    """Dogs that are available, belong to a shelter and haven't been swiped."""
+    return [dog for dog in dogs if is_eligible(dog, swiped_dog_ids)]
+
+
+def dog_distances(dogs, lat, lon, shelter_locations):
+    """Distance in km (2dp) from (lat, lon) to each dog's shelter, in one NumPy call."""
+    shelter_ids = list(dict.fromkeys(dog['shelter_id'] for dog in dogs))
+    shelter_index = {shelter_id: i for i, shelter_id in enumerate(shelter_ids)}
+    shelter_distances = haversine_many(
+        lat, lon,
+        [shelter_locations[s][0] for s in shelter_ids],
+        [shelter_locations[s][1] for s in shelter_ids],
+    )
+    return np.round(shelter_distances[[shelter_index[dog['shelter_id']] for dog in dogs]], 2)
+
+
+def candidate_distances(client, lat, lon, swiped_dog_ids, cognito=None, user_pool_id=None, after=None):
+    """
+    A `measure` for find_nearby_dogs: each dog's distance from (lat, lon),
+    or inf for dogs that can't go in the adopter's deck. With `after`, a
+    (distance_km, dog_id) paging position, dogs at or before it are inf too.
+    """
+    def measure(dogs):
+        distances = np.full(len(dogs), np.inf)
+        eligible = [i for i, dog in enumerate(dogs) if is_eligible(dog, swiped_dog_ids)]
+        if eligible:
+            shelter_locations = get_shelter_locations(
+                client, [dogs[i]['shelter_id'] for i in eligible],
+                cognito=cognito, user_pool_id=user_pool_id
+            )
+            distances[eligible] = dog_distances([dogs[i] for i in eligible], lat, lon, shelter_locations)
+        if after is not None and len(dogs):
+            dog_ids = np.array([dog['dog_id'] for dog in dogs], dtype=str)
+            seen = (distances < after[0]) | ((distances == after[0]) & (dog_ids <= after[1]))
+            distances[seen] = np.inf
+        return distances
+    return measure
+
+
+def build_deck(client, table_name, adopter_id, lat, lon, cognito=None, user_pool_id=None,
+               size=MAX_DECK_SIZE, max_radius_km=MAX_SEARCH_RADIUS_KM):
+    """
+    Rank the dogs near an adopter into a swipe deck.
+
+    Only ranking attributes are read, and only dogs inside the radius the
+    geohash rings fully cover are ranked. Returns up to `size` tuples of
+    (dog_id, created_at, distance_km) ordered by (distance, dog_id).
+    """
+    swiped = load_swiped_dog_ids(client, adopter_id, excluded_directions())
+    dogs, _ = find_nearby_dogs(
+        client, table_name, lat, lon, target=size, max_radius_km=max_radius_km,
+        attributes=RANKING_ATTRIBUTES,
+        measure=candidate_distances(client, lat, lon, swiped, cognito=cognito, user_pool_id=user_pool_id),
+    )
+    if not dogs:
+        dogs = list(parallel_scan(client, table_name, **projection(RANKING_ATTRIBUTES)))
+
+    dogs = eligible_dogs(dogs, swiped)
+    shelter_locations = get_shelter_locations(
+        client, [dog['shelter_id'] for dog in dogs], cognito=cognito, user_pool_id=user_pool_id
+    )
+    distances = dog_distances(dogs, lat, lon, shelter_locations)
+    dog_ids = np.array([dog['dog_id'] for dog in dogs], dtype=str)
+    return [
+        (dogs[i]['dog_id'], dogs[i]['created_at'], float(distances[i]))
+        for i in top_k(distances, size, tiebreak=dog_ids)
+    ]
@@ -0,0 +1,148 @@
+import csv
+import json
+import uuid
+from datetime import datetime, timedelta
+
+from boto3.dynamodb.types import TypeSerializer
+
+from pawdopt_common.dynamo_batch import BATCH_WRITE_LIMIT, batch_write
+from pawdopt_common.log import get_logger
+from pawdopt_common.photo_variants import link_photos
+
+logger = get_logger(__name__)
+
+REQUIRED_FIELDS = ('name', 'dob', 'breed', 'gender', 'size')
+OPTIONAL_FIELDS = ('color', 'description')
+DOG_STATUSES = ('AVAILABLE', 'ADOPTED')
+FORMATS = ('csv', 'jsonl')
+
+serialiser = TypeSerializer()
+
+
+def detect_format(content_type=None, key=None):
+    """Pick 'csv' or 'jsonl' from a Content-Type or an object key's extension."""
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type == 'text/csv' or (key or '').lower().endswith('.csv'):
+        return 'csv'
+    if content_type in ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines') \
+            or (key or '').lower().endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+
+def parse_rows(stream, fmt):
+    """
+    Yield (row_number, row) from a text stream, one row at a time.
+
+    `row` is a dict, or the ValueError that made the row unreadable.
+    CSV photo_keys are separated by ';'. Blank JSON lines are skipped.
+    """
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            row = {k.strip(): (v or '').strip() for k, v in row.items() if k}
+            keys = row.get('photo_keys', '')
+            row['photo_keys'] = [k.strip() for k in keys.split(';') if k.strip()]
+            yield number, row
+    else:
+        number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError('Row is not a JSON object')
+                yield number, row
+            except ValueError as e:
+                yield number, ValueError(f'Invalid JSON: {e}')
+
+
+def validate(row):
+    """Return the dog fields for a row, or raise ValueError naming what is wrong."""
+    missing = [field for field in REQUIRED_FIELDS if not str(row.get(field) or '').strip()]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+
+    dog = {field: str(row[field]).strip() for field in REQUIRED_FIELDS}
+    for field in OPTIONAL_FIELDS:
+        if row.get(field):
+            dog[field] = str(row[field]).strip()
+
+    try:
+        born = datetime.strptime(dog['dob'], '%Y/%m')
+    except ValueError:
+        raise ValueError('dob must be YYYY/MM')
+    today = datetime.utcnow()
+    dog['age'] = today.year - born.year - (today.month < born.month)
+    if dog['age'] < 0:
+        raise ValueError('dob is in the future')
+
+    dog['dog_status'] = str(row.get('dog_status') or 'AVAILABLE').upper()
+    if dog['dog_status'] not in DOG_STATUSES:
+        raise ValueError(f"dog_status must be one of {', '.join(DOG_STATUSES)}")
+
+    photo_keys = row.get('photo_keys') or []
+    if not isinstance(photo_keys, list) or not all(isinstance(k, str) for k in photo_keys):
+        raise ValueError('photo_keys must be a list of strings')
+    dog['photo_key'] = photo_keys
+    return dog
+
+
+def import_dogs(client, rows, shelter_id, cell, report, table_name='dog'):
+    """
+    Validate and write streamed rows, 25 dogs per BatchWriteItem.
+
+    Only one chunk of dogs is held at a time. `report` is called with one
+    entry per row: {"row", "dogId"} once written, or {"row", "error"}.
+    Every dog gets a fresh id, so no existence check is needed. A chunk
+    whose write fails has each of its rows reported as failed, and the
+    import carries on with the next chunk. Returns (created, failed).
+    """
+    now = datetime.utcnow()
+    pending = []
+    counts = {'created': 0, 'failed': 0}
+
+    def flush():
+        try:
+            batch_write(client, [(table_name, item) for _, _, item in pending])
+        except Exception as e:
+            logger.exception('Could not write import rows %d-%d', pending[0][0], pending[-1][0])
+            for number, _, _ in pending:
+                report({'row': number, 'error': f'Write failed: {e}'})
+            counts['failed'] += len(pending)
+            pending.clear()
+            return
+        for number, dog_id, item in pending:
+            link_photos(client, dog_id, item['created_at']['S'], [k['S'] for k in item['photo_key']['L']])
+            report({'row': number, 'dogId': dog_id})
+        counts['created'] += len(pending)
+        pending.clear()
+
+    for number, row in rows:
+        try:
+            if isinstance(row, Exception):
+                raise row
+            dog = validate(row)
+        except ValueError as e:
+            report({'row': number, 'error': str(e)})
+            counts['failed'] += 1
+            continue
+
+        dog_id = str(uuid.uuid4())
+        dog.update({
+            'dog_id': dog_id,
+            # Distinct timestamps keep the import's order on the shelter index
+            'created_at': (now + timedelta(microseconds=number)).isoformat(),
+            'shelter_id': shelter_id,
+            'photo_variants': {},
+        })
+        if cell:
+            dog['geohash'] = cell
+        pending.append((number, dog_id, {k: serialiser.serialize(v) for k, v in dog.items()}))
+        if len(pending) == BATCH_WRITE_LIMIT:
+            flush()
+
+    if pending:
+        flush()
+    return counts['created'], counts['failed']
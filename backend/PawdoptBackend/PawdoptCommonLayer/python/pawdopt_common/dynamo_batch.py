@@ -0,0 +1,151 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from pawdopt_common.projections import projection
+
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+BATCH_MAX_RETRIES = int(os.environ.get('BATCH_MAX_RETRIES', '8'))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', '4'))
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_MAX_SECONDS = 2.0
+
+DOG_TABLE = 'dog'
+
+deserialiser = TypeDeserializer()
+
+
+def backoff(attempt):
+    """Sleep with full jitter before retry number `attempt` (1-based)."""
+    time.sleep(random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)))
+
+
+def _key_id(key, key_names):
+    return tuple(next(iter(key[name].values())) for name in key_names)
+
+
+def _get_chunk(client, table_name, keys, extra):
+    """One BatchGetItem of up to 100 keys, retrying UnprocessedKeys."""
+    items = []
+    request = {table_name: {'Keys': keys, **extra}}
+    attempt = 0
+    while True:
+        response = client.batch_get_item(RequestItems=request)
+        items.extend(response.get('Responses', {}).get(table_name, []))
+        request = response.get('UnprocessedKeys')
+        if not request:
+            return items
+        attempt += 1
+        if attempt > BATCH_MAX_RETRIES:
+            raise RuntimeError(
+                f"{len(request[table_name]['Keys'])} keys still unprocessed in {table_name} "
+                f"after {BATCH_MAX_RETRIES} retries"
+            )
+        backoff(attempt)
+
+
+def batch_get(client, table_name, keys, key_names, attributes=None,
+              max_workers=BATCH_MAX_WORKERS, deserialize=True):
+    """
+    Read many items by key, returning them in the same order as `keys`.
+
+    `keys` are low-level key maps such as {'dog_id': {'S': ...}, ...} and
+    `key_names` names their attributes. Keys are de-duplicated and split
+    into 100-key BatchGetItem calls that run concurrently, and
+    UnprocessedKeys are retried with jittered exponential backoff. Missing
+    items come back as None. `attributes` limits the projection; key
+    attributes are always read.
+    """
+    if attributes is not None:
+        attributes = list(key_names) + [a for a in attributes if a not in key_names]
+    extra = projection(attributes)
+
+    unique = list({_key_id(key, key_names): key for key in keys}.values())
+    chunks = [unique[i:i + BATCH_GET_LIMIT] for i in range(0, len(unique), BATCH_GET_LIMIT)]
+
+    if len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+            results = list(pool.map(lambda chunk: _get_chunk(client, table_name, chunk, extra), chunks))
+    else:
+        results = [_get_chunk(client, table_name, chunk, extra) for chunk in chunks]
+
+    found = {}
+    for items in results:
+        for item in items:
+            found[_key_id(item, key_names)] = (
+                {k: deserialiser.deserialize(v) for k, v in item.items()} if deserialize else item
+            )
+    return [found.get(_key_id(key, key_names)) for key in keys]
+
+
+def get_dogs(client, keys, attributes=None, table_name=DOG_TABLE):
+    """Hydrate dogs from (dog_id, created_at) pairs, in input order (None if missing)."""
+    return batch_get(
+        client, table_name,
+        [{'dog_id': {'S': dog_id}, 'created_at': {'S': created_at}} for dog_id, created_at in keys],
+        ('dog_id', 'created_at'),
+        attributes=attributes,
+    )
+
+
+def _write_chunk(client, request):
+    """One BatchWriteItem of up to 25 requests, retrying UnprocessedItems."""
+    attempt = 0
+    while True:
+        response = client.batch_write_item(RequestItems=request)
+        request = response.get('UnprocessedItems')
+        if not request:
+            return
+        attempt += 1
+        if attempt > BATCH_MAX_RETRIES:
+            remaining = sum(len(writes) for writes in request.values())
+            raise RuntimeError(
+                f"{remaining} writes still unprocessed after {BATCH_MAX_RETRIES} retries"
+            )
+        backoff(attempt)
+
+
+def _write_all(client, writes, max_workers):
+    """Send (table_name, write_request) pairs as concurrent 25-item BatchWriteItem calls."""
+    chunks = []
+    for i in range(0, len(writes), BATCH_WRITE_LIMIT):
+        request = {}
+        for table_name, write in writes[i:i + BATCH_WRITE_LIMIT]:
+            request.setdefault(table_name, []).append(write)
+        chunks.append(request)
+
+    if len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+            list(pool.map(lambda request: _write_chunk(client, request), chunks))
+    else:
+        for request in chunks:
+            _write_chunk(client, request)
+
+
+def batch_write(client, puts, max_workers=BATCH_MAX_WORKERS):
+    """
+    Put many low-level items, possibly across several tables.
+
+    `puts` is a list of (table_name, item) pairs. They are split into
+    25-item BatchWriteItem calls that run concurrently, and UnprocessedItems
+    are retried with jittered exponential backoff. BatchWriteItem takes no
+    conditions, so callers must make the keys unique themselves.
+    """
+    _write_all(
+        client,
+        [(table_name, {'PutRequest': {'Item': item}}) for table_name, item in puts],
+        max_workers
+    )
+
+
+def batch_delete(client, table_name, keys, max_workers=BATCH_MAX_WORKERS):
+    """Delete many items from one table by low-level key, like batch_write."""
+    _write_all(
+        client,
+        [(table_name, {'DeleteRequest': {'Key': key}}) for key in keys],
+        max_workers
+    )
@@ -0,0 +1,148 @@
+import json
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+from pawdopt_common.dynamo_batch import batch_write
+from pawdopt_common.log import get_logger
+
+logger = get_logger(__name__)
+
+EVENT_DISPATCHER = os.environ.get('EVENT_DISPATCHER', 'lambda')  # lambda, outbox or local
+EVENT_OUTBOX_TABLE = os.environ.get('EVENT_OUTBOX_TABLE', 'event_outbox')
+
+DOG_ADOPTED = 'dog.adopted'
+
+
+# chatCRUD's programmatic action takes one adoption per invocation
+SUBSCRIBERS = {
+    DOG_ADOPTED: [
+        ('chatCRUD', lambda events: [
+            {"action": "updateChatStatus", "payload": event['payload']} for event in events
+        ]),
+    ],
+}
+
+
+def make_event(event_type, payload):
+    return {
+        'event_id': str(uuid.uuid4()),
+        'type': event_type,
+        'occurred_at': datetime.utcnow().isoformat(),
+        'payload': payload,
+    }
+
+
+def outbox_item(event):
+    """Low-level outbox row for an event; the payload is stored as JSON."""
+    return {
+        'event_id': {'S': event['event_id']},
+        'type': {'S': event['type']},
+        'occurred_at': {'S': event['occurred_at']},
+        'payload': {'S': json.dumps(event['payload'], default=str)},
+    }
+
+
+def read_outbox_item(item):
+    """The event held in a low-level outbox row, such as a stream NewImage."""
+    return {
+        'event_id': item['event_id']['S'],
+        'type': item['type']['S'],
+        'occurred_at': item['occurred_at']['S'],
+        'payload': json.loads(item['payload']['S']),
+    }
+
+
+class LambdaDispatcher:
+    """
+    Hand events to subscriber Lambdas with fire-and-forget invocations.
+
+    `subscribers` maps an event type to (function_name, to_payload) pairs,
+    where to_payload turns the events of one publish call into the list of
+    invocation payloads that function expects. Functions that take a batch
+    can return a single payload holding every event.
+    """
+
+    transactional = False
+
+    def __init__(self, client, subscribers):
+        self.client = client
+        self.subscribers = subscribers
+
+    def publish(self, *events):
+        by_target = defaultdict(list)
+        for event in events:
+            for function_name, to_payload in self.subscribers.get(event['type'], []):
+                by_target[(function_name, to_payload)].append(event)
+        for (function_name, to_payload), target_events in by_target.items():
+            for payload in to_payload(target_events):
+                self.client.invoke(
+                    FunctionName=function_name,
+                    InvocationType='Event',
+                    Payload=json.dumps(payload).encode()
+                )
+            logger.info('Dispatched %d events to %s', len(target_events), function_name)
+
+
+class OutboxDispatcher:
+    """
+    Append events to an outbox table for EventOutboxConsumer to deliver.
+
+    The table (partition key `event_id`) has a DynamoDB stream, so the
+    consumer receives many events per invocation and retries failed
+    batches. Callers that change data should write the event with
+    put_request() in the same TransactWriteItems as the change, so the
+    event exists exactly when the change does.
+    """
+
+    transactional = True
+
+    def __init__(self, client, table_name=EVENT_OUTBOX_TABLE):
+        self.client = client
+        self.table_name = table_name
+
+    def put_request(self, event):
+        """A TransactWriteItems Put for `event`."""
+        return {
+            'Put': {
+                'TableName': self.table_name,
+                'Item': outbox_item(event),
+                'ConditionExpression': 'attribute_not_exists(event_id)',
+            }
+        }
+
+    def publish(self, *events):
+        batch_write(self.client, [(self.table_name, outbox_item(event)) for event in events])
+
+
+class LocalDispatcher:
+    """In-process stand-in: records events and calls handlers registered with subscribe()."""
+
+    transactional = False
+
+    def __init__(self):
+        self.published = []
+        self.handlers = defaultdict(list)
+
+    def subscribe(self, event_type, handler):
+        self.handlers[event_type].append(handler)
+
+    def publish(self, *events):
+        self.published.extend(events)
+        for event in events:
+            for handler in self.handlers[event['type']]:
+                handler(event)
+
+
+def get_dispatcher(subscribers=None, kind=None, lambda_client=None, dynamo_client=None):
+    """Build the dispatcher named by EVENT_DISPATCHER (or `kind`)."""
+    kind = kind or EVENT_DISPATCHER
+    if kind == 'local':
+        return LocalDispatcher()
+    import boto3
+    if kind == 'outbox':
+        return OutboxDispatcher(dynamo_client or boto3.client('dynamodb'))
+    if kind == 'lambda':
+        return LambdaDispatcher(lambda_client or boto3.client('lambda'), SUBSCRIBERS if subscribers is None else subscribers)
+    raise ValueError(f'Unknown event dispatcher {kind}')
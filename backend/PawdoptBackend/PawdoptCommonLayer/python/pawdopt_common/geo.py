@@ -0,0 +1,49 @@
+from math import radians, cos, sin, asin, sqrt
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    """Calculate the great circle distance in km between two points."""
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+    c = 2 * asin(sqrt(a))
+    return c * EARTH_RADIUS_KM
+
+
+def haversine_many(lat, lon, lats, lons):
+    """Distances in km from (lat, lon) to every point in the lats/lons arrays."""
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def top_k(values, k=None, tiebreak=None):
+    """
+    Indices of the k smallest values, nearest first.
+
+    Uses argpartition so only values up to the k-th smallest are sorted.
+    Ties are broken by `tiebreak` (e.g. dog IDs) when given, otherwise by
+    position, so the order is stable across calls. With `k=None` (or k past
+    the end) every index is returned in sorted order.
+    """
+    values = np.asarray(values)
+    if k is not None and k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k is None or k >= len(values):
+        candidates = np.arange(len(values))
+    else:
+        kth = values[np.argpartition(values, k - 1)[k - 1]]
+        candidates = np.flatnonzero(values <= kth)
+    if tiebreak is None:
+        order = np.argsort(values[candidates], kind='stable')
+    else:
+        order = np.lexsort((np.asarray(tiebreak)[candidates], values[candidates]))
+    return candidates[order][:k]
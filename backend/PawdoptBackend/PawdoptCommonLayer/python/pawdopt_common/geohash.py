@@ -0,0 +1,82 @@
+from math import cos, radians
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Precision of the cell key stored on dog items. A precision 4 cell is
+# roughly 20km x 20km at UK latitudes.
+INDEX_PRECISION = 4
+
+KM_PER_DEGREE = 111.32
+
+
+def encode(lat, lon, precision=INDEX_PRECISION):
+    """Encode a latitude/longitude pair as a geohash string."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    ch = 0
+    bit = 0
+    even = True
+    while len(geohash) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if lon >= mid:
+                ch |= 1 << (4 - bit)
+                lon_range[0] = mid
+            else:
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                ch |= 1 << (4 - bit)
+                lat_range[0] = mid
+            else:
+                lat_range[1] = mid
+        even = not even
+        if bit < 4:
+            bit += 1
+        else:
+            geohash.append(BASE32[ch])
+            bit = 0
+            ch = 0
+    return ''.join(geohash)
+
+
+def cell_size(precision=INDEX_PRECISION):
+    """Return the (lat, lon) size in degrees of a cell at this precision."""
+    lat_bits = (5 * precision) // 2
+    lon_bits = (5 * precision + 1) // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def ring(lat, lon, k, precision=INDEX_PRECISION):
+    """
+    Return the cells exactly k steps away from the cell containing (lat, lon).
+
+    Ring 0 is the cell itself, ring 1 its 8 neighbours, and so on. Cells past
+    the poles are dropped and longitudes wrap around the antimeridian.
+    """
+    if k == 0:
+        return [encode(lat, lon, precision)]
+    dlat, dlon = cell_size(precision)
+    cells = []
+    for i in range(-k, k + 1):
+        cell_lat = lat + i * dlat
+        if cell_lat > 90 or cell_lat < -90:
+            continue
+        for j in range(-k, k + 1):
+            if max(abs(i), abs(j)) != k:
+                continue
+            cell_lon = (lon + j * dlon + 180) % 360 - 180
+            cell = encode(cell_lat, cell_lon, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def covered_radius_km(lat, k, precision=INDEX_PRECISION):
+    """Radius in km that is guaranteed to be covered by rings 0..k."""
+    dlat, dlon = cell_size(precision)
+    height_km = dlat * KM_PER_DEGREE
+    width_km = dlon * KM_PER_DEGREE * max(cos(radians(lat)), 0.01)
+    return k * min(height_km, width_km)
@@ -0,0 +1,105 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+
+def _modified_at(dog):
+    """When the dog item last changed (updated_at, or created_at if never updated)."""
+    stamp = dog.get('updated_at') or dog.get('created_at')
+    if not stamp:
+        return None
+    modified = datetime.fromisoformat(stamp)
+    if modified.tzinfo is None:
+        modified = modified.replace(tzinfo=timezone.utc)
+    return modified.replace(microsecond=0)
+
+
+def _json_default(value):
+    # Sets come back from DynamoDB unordered; everything else (Decimal) as text
+    return sorted(value, key=str) if isinstance(value, (set, frozenset)) else str(value)
+
+
+def dog_etag(dog, window):
+    """
+    Strong ETag for one dog representation.
+
+    Built from every attribute of the item as read (so a writer that
+    forgets updated_at still changes it) plus the signing window: the body
+    carries presigned photo URLs, so a new window has to produce a new
+    representation.
+    """
+    digest = hashlib.sha1(
+        json.dumps([dog, window], sort_keys=True, default=_json_default).encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def combined_etag(etags, *extra):
+    """Strong ETag for a list: the member ETags in order plus any extra state."""
+    digest = hashlib.sha1(json.dumps([list(etags), list(extra)], default=_json_default).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def last_modified(dogs, window_start):
+    """
+    Latest change across `dogs`, never earlier than the signing window start.
+
+    Clamping to the window keeps If-Modified-Since from revalidating a body
+    whose photo URLs were signed in an earlier window.
+    """
+    stamps = [m for m in (_modified_at(dog) for dog in dogs) if m]
+    window_start = datetime.fromtimestamp(window_start, tz=timezone.utc)
+    return max(stamps + [window_start])
+
+
+def http_date(moment):
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def _matches(if_none_match, etag):
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison, as If-None-Match requires
+    return any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+def not_modified(headers, etag, modified=None):
+    """
+    True if the request's validators show the client already has this version.
+
+    If-None-Match wins when present; If-Modified-Since is only consulted
+    without it. Header names are matched case-insensitively.
+    """
+    headers = {k.lower(): v for k, v in (headers or {}).items()}
+    if_none_match = headers.get('if-none-match')
+    if if_none_match:
+        return _matches(if_none_match, etag)
+
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since and modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return modified <= since
+    return False
+
+
+def validator_headers(etag, modified=None):
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if modified is not None:
+        headers['Last-Modified'] = http_date(modified)
+    return headers
+
+
+def not_modified_response(etag, modified=None):
+    """A 304 with the validators and no body."""
+    return {
+        'statusCode': '304',
+        'headers': validator_headers(etag, modified),
+        'body': '',
+    }
@@ -0,0 +1,99 @@
+import io
+import os
+import posixpath
+
+# Fixed widths per view; images are never upscaled
+VARIANT_WIDTHS = {
+    'thumb': int(os.environ.get('THUMB_WIDTH', '160')),
+    'card': int(os.environ.get('CARD_WIDTH', '640')),
+    'full': int(os.environ.get('FULL_WIDTH', '1280')),
+}
+VARIANT_FORMAT = os.environ.get('PHOTO_VARIANT_FORMAT', 'WEBP').upper()  # WEBP or JPEG
+VARIANT_QUALITY = int(os.environ.get('PHOTO_VARIANT_QUALITY', '80'))
+VARIANT_PREFIX = 'variants/'
+# Uploads the resizer handles; other objects in the bucket (dog imports and
+# their .report.jsonl reports) are left alone
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+_EXTENSIONS = {'WEBP': ('webp', 'image/webp'), 'JPEG': ('jpg', 'image/jpeg')}
+
+
+def is_variant(key):
+    return key.startswith(VARIANT_PREFIX)
+
+
+def is_photo_upload(key):
+    """An uploaded original photo: an image extension and not one of our variants."""
+    return not is_variant(key) and key.lower().endswith(PHOTO_EXTENSIONS)
+
+
+def variant_key(key, name, fmt=VARIANT_FORMAT):
+    """variants/<name>/<original key without extension>.<ext>"""
+    stem, _ = posixpath.splitext(key)
+    return f'{VARIANT_PREFIX}{name}/{stem}.{_EXTENSIONS[fmt][0]}'
+
+
+def make_variants(data, widths=VARIANT_WIDTHS, fmt=VARIANT_FORMAT, quality=VARIANT_QUALITY):
+    """
+    Resize image bytes to each width, returning {name: encoded bytes}.
+
+    The original is decoded once, rotated by its EXIF orientation and then
+    downscaled from largest to smallest. Pillow is imported here so other
+    users of the layer don't need it.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original).convert('RGB')
+
+    variants = {}
+    for name, width in sorted(widths.items(), key=lambda item: -item[1]):
+        if image.width > width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, format=fmt, quality=quality, optimize=True)
+        variants[name] = out.getvalue()
+    return variants
+
+
+class S3Bucket:
+    def __init__(self, s3, name):
+        self.s3 = s3
+        self.name = name
+
+    def get(self, key):
+        return self.s3.get_object(Bucket=self.name, Key=key)['Body'].read()
+
+    def put(self, key, data, content_type):
+        self.s3.put_object(
+            Bucket=self.name, Key=key, Body=data, ContentType=content_type,
+            CacheControl='public, max-age=31536000, immutable'
+        )
+
+
+class LocalBucket:
+    """Directory-backed stand-in for an S3 bucket, for running the resizer locally."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def get(self, key):
+        with open(os.path.join(self.root, key), 'rb') as f:
+            return f.read()
+
+    def put(self, key, data, content_type):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+def resize_upload(bucket, key, fmt=VARIANT_FORMAT):
+    """Write every variant of an uploaded photo to `bucket`. Returns {name: (key, bytes written)}."""
+    variants = make_variants(bucket.get(key), fmt=fmt)
+    written = {}
+    for name, data in variants.items():
+        out_key = variant_key(key, name, fmt)
+        bucket.put(out_key, data, _EXTENSIONS[fmt][1])
+        written[name] = (out_key, len(data))
+    return written
@@ -0,0 +1,33 @@
+import json
+import logging
+import os
+import random
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# Fraction of requests whose full payloads are logged when LOG_LEVEL=DEBUG
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', '0.01'))
+
+# The Lambda runtime already installs a root handler; this only matters locally
+logging.basicConfig(level=LOG_LEVEL)
+
+
+def get_logger(name):
+    """Return a logger whose level comes from the LOG_LEVEL environment variable."""
+    logger = logging.getLogger(name)
+    logger.setLevel(LOG_LEVEL)
+    return logger
+
+
+def log_payload(logger, label, payload, sample_rate=None):
+    """
+    Log a full payload (event, response body, DynamoDB items) at DEBUG level.
+
+    Only a sampled fraction of calls are logged, and the payload is not
+    serialised at all unless DEBUG is enabled and the call is sampled.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    rate = LOG_PAYLOAD_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate < 1 and random.random() >= rate:
+        return
+    logger.debug('%s: %s', label, json.dumps(payload, default=str))
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from pawdopt_common import geohash
+from pawdopt_common.projections import CARD_ATTRIBUTES, projection
+
+GEO_INDEX_NAME = 'geohash-index'
+
+deserialiser = TypeDeserializer()
+
+
+def _query_cell(client, table_name, index_name, cell, attributes):
+    """Read every dog stored under one geohash cell, following all pages."""
+    items = []
+    query_kwargs = {
+        'TableName': table_name,
+        'IndexName': index_name,
+        'KeyConditionExpression': 'geohash = :cell',
+        'ExpressionAttributeValues': {':cell': {'S': cell}},
+        **projection(attributes),
+    }
+    while True:
+        response = client.query(**query_kwargs)
+        items.extend(
+            {k: deserialiser.deserialize(v) for k, v in item.items()}
+            for item in response.get('Items', [])
+        )
+        if 'LastEvaluatedKey' not in response:
+            return items
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def find_nearby_dogs(client, table_name, lat, lon, target, max_radius_km,
+                     min_radius_km=0, index_name=GEO_INDEX_NAME, max_workers=8,
+                     attributes=CARD_ATTRIBUTES, measure=None):
+    """
+    Collect dogs from the geohash cells around (lat, lon).
+
+    Rings of cells are queried outwards from the adopter's cell until at
+    least `target` dogs have been found and `min_radius_km` is covered, or
+    the rings reach `max_radius_km`. Cells within a ring are queried
+    concurrently and only `attributes` are read (None reads whole items).
+
+    `measure(dogs)` returns each dog's distance in km. With it, only dogs
+    inside the covered radius are returned, and only those at least
+    `min_radius_km` away count towards `target`: a dog found in an outer
+    ring cell may be further away than one in a ring not yet queried.
+    Once the rings reach `max_radius_km` every dog found is returned.
+    Returns (dogs, covered_radius_km).
+    """
+    dogs = []
+    seen = set()
+    k = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            cells = geohash.ring(lat, lon, k)
+            results = pool.map(
+                lambda cell: _query_cell(client, table_name, index_name, cell, attributes),
+                cells,
+            )
+            for cell_items in results:
+                for item in cell_items:
+                    key = (item['dog_id'], item['created_at'])
+                    if key not in seen:
+                        seen.add(key)
+                        dogs.append(item)
+
+            covered = geohash.covered_radius_km(lat, k)
+            if covered >= max_radius_km:
+                return dogs, covered
+            if measure is None:
+                inside, counted = dogs, len(dogs)
+            else:
+                distances = measure(dogs)
+                inside = [dog for dog, distance in zip(dogs, distances) if distance <= covered]
+                counted = sum(1 for distance in distances if min_radius_km <= distance <= covered)
+            if counted >= target and covered >= min_radius_km:
+                return inside, covered
+            k += 1
@@ -0,0 +1,17 @@
+import base64
+import json
+
+
+def encode_cursor(value):
+    """Encode a JSON-serialisable position as an opaque x-next token."""
+    return base64.b64encode(json.dumps(value).encode()).decode()
+
+
+def decode_cursor(token):
+    """Decode an x-next token, or return None when there isn't one."""
+    if not token:
+        return None
+    try:
+        return json.loads(base64.b64decode(token))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
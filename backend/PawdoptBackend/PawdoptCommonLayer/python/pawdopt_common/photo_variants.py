@@ -0,0 +1,111 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from pawdopt_common.log import get_logger
+
+logger = get_logger(__name__)
+
+PHOTO_VARIANT_TABLE = os.environ.get('PHOTO_VARIANT_TABLE', 'photo_variant')
+DOG_TABLE = 'dog'
+
+deserialiser = TypeDeserializer()
+
+
+def _upsert(client, photo_key, update_expression, values):
+    """Update the photo's handshake row and return it as a plain dict."""
+    response = client.update_item(
+        TableName=PHOTO_VARIANT_TABLE,
+        Key={'photo_key': {'S': photo_key}},
+        UpdateExpression=update_expression,
+        ExpressionAttributeValues=values,
+        ReturnValues='ALL_NEW'
+    )
+    return {k: deserialiser.deserialize(v) for k, v in response['Attributes'].items()}
+
+
+def attach_to_dog(client, dog_id, created_at, photo_key, variants):
+    """Set photo_variants[photo_key] on the dog, creating the map on older items."""
+    key = {'dog_id': {'S': dog_id}, 'created_at': {'S': created_at}}
+    value = {'M': {name: {'S': variant} for name, variant in variants.items()}}
+    # updated_at moves with the body so cache validators see the new variants
+    now = {'S': datetime.utcnow().isoformat()}
+    for _ in range(2):
+        try:
+            client.update_item(
+                TableName=DOG_TABLE, Key=key,
+                UpdateExpression='SET photo_variants.#photo = :variants, updated_at = :now',
+                ConditionExpression='attribute_exists(photo_variants)',
+                ExpressionAttributeNames={'#photo': photo_key},
+                ExpressionAttributeValues={':variants': value, ':now': now}
+            )
+            return True
+        except client.exceptions.ConditionalCheckFailedException:
+            pass
+        try:
+            client.update_item(
+                TableName=DOG_TABLE, Key=key,
+                UpdateExpression='SET photo_variants = :variants, updated_at = :now',
+                ConditionExpression='attribute_exists(dog_id) AND attribute_not_exists(photo_variants)',
+                ExpressionAttributeValues={':variants': {'M': {photo_key: value}}, ':now': now}
+            )
+            return True
+        except client.exceptions.ConditionalCheckFailedException:
+            # Either the map appeared meanwhile (retry the first form) or the dog is gone
+            pass
+    logger.warning('Could not attach variants of %s to dog %s', photo_key, dog_id)
+    return False
+
+
+def record_variants(client, photo_key, variants):
+    """
+    Resizer side of the handshake: store a photo's variant keys.
+
+    The photo_variant row is shared with link_photos. Whichever side writes
+    second sees both halves in ALL_NEW and attaches the variants to the dog,
+    so the order in which upload processing and dog registration finish
+    does not matter.
+    """
+    row = _upsert(client, photo_key, 'SET variants = :variants', {
+        ':variants': {'M': {name: {'S': key} for name, key in variants.items()}},
+    })
+    if row.get('dog_id'):
+        attach_to_dog(client, row['dog_id'], row['dog_created_at'], photo_key, variants)
+
+
+def link_photos(client, dog_id, created_at, photo_keys, max_workers=6):
+    """Dog side of the handshake: tie photo keys to their dog, attaching ready variants."""
+    def link(photo_key):
+        row = _upsert(client, photo_key, 'SET dog_id = :dog_id, dog_created_at = :created_at', {
+            ':dog_id': {'S': dog_id},
+            ':created_at': {'S': created_at},
+        })
+        if row.get('variants'):
+            attach_to_dog(client, dog_id, created_at, photo_key, row['variants'])
+
+    if not photo_keys:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(photo_keys))) as pool:
+        list(pool.map(link, photo_keys))
+
+
+def original_keys(dog):
+    """A dog's original photo keys; older items store a single string."""
+    photo_key = dog.get('photo_key') or []
+    return [photo_key] if isinstance(photo_key, str) else list(photo_key)
+
+
+def view_keys(dog, view):
+    """The keys to sign for a view ('thumb', 'card' or 'full'), falling back to originals."""
+    variants = dog.get('photo_variants') or {}
+    return [variants.get(key, {}).get(view, key) for key in original_keys(dog)]
+
+
+def all_keys(dog):
+    """Every stored object for a dog's photos: originals plus their variants."""
+    keys = original_keys(dog)
+    for variants in (dog.get('photo_variants') or {}).values():
+        keys.extend(variants.values())
+    return keys
@@ -0,0 +1,35 @@
+# Attributes a swipe card needs: no description and only the first photo
+# (plus the small map of resized variants, so the card variant can be signed)
+CARD_ATTRIBUTES = [
+    'dog_id', 'created_at', 'shelter_id', 'name', 'age', 'dob',
+    'breed', 'gender', 'size', 'dog_status', 'photo_key[0]', 'photo_variants',
+]
+
+# Attributes needed to rank dogs into a deck before any card is hydrated
+RANKING_ATTRIBUTES = ['dog_id', 'created_at', 'shelter_id', 'dog_status']
+
+# Full profiles read the whole item (GetDogProfile)
+PROFILE_ATTRIBUTES = None
+
+
+def projection(attributes):
+    """
+    Build ProjectionExpression kwargs for a Scan, Query, GetItem or BatchGetItem.
+
+    Every attribute goes through an ExpressionAttributeNames placeholder so
+    reserved words like `name` and `size` are safe. Returns {} for None,
+    which reads the full item.
+    """
+    if attributes is None:
+        return {}
+    names = {}
+    parts = []
+    for attribute in attributes:
+        base, bracket, index = attribute.partition('[')
+        placeholder = '#' + base
+        names[placeholder] = base
+        parts.append(placeholder + bracket + index)
+    return {
+        'ProjectionExpression': ', '.join(parts),
+        'ExpressionAttributeNames': names,
+    }
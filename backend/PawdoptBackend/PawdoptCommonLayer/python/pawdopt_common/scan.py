@@ -0,0 +1,95 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from pawdopt_common.log import get_logger
+
+logger = get_logger(__name__)
+
+SCAN_SEGMENTS = int(os.environ.get('SCAN_SEGMENTS', '4'))
+SCAN_QUEUE_SIZE = int(os.environ.get('SCAN_QUEUE_SIZE', '1000'))
+
+deserialiser = TypeDeserializer()
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+def parallel_scan(client, table_name, total_segments=SCAN_SEGMENTS, max_workers=None,
+                  queue_size=SCAN_QUEUE_SIZE, deserialize=True, **scan_kwargs):
+    """
+    Yield every item in a table, scanning Segment/TotalSegments in parallel.
+
+    Each segment runs on a worker thread that follows LastEvaluatedKey to the
+    end of its segment and pushes items onto a bounded queue, so workers
+    pause when the caller falls behind. Items are yielded as they arrive, in
+    no particular order. Extra keyword arguments (FilterExpression,
+    ProjectionExpression, ...) are passed to every Scan call. `client` must
+    be a low-level DynamoDB client, which is safe to share between threads.
+    """
+    items = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(obj):
+        while True:
+            try:
+                items.put(obj, timeout=0.1)
+                return True
+            except queue.Full:
+                if stop.is_set():
+                    return False
+
+    def scan_segment(segment):
+        started = time.monotonic()
+        count = 0
+        pages = 0
+        kwargs = dict(scan_kwargs, TableName=table_name, Segment=segment, TotalSegments=total_segments)
+        try:
+            while not stop.is_set():
+                response = client.scan(**kwargs)
+                pages += 1
+                for item in response.get('Items', []):
+                    if not put(item):
+                        return
+                    count += 1
+                if 'LastEvaluatedKey' not in response:
+                    break
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            elapsed = time.monotonic() - started
+            logger.info(
+                'Scan %s segment %d/%d: %d items in %d pages, %.2fs (%.0f items/s)',
+                table_name, segment, total_segments, count, pages, elapsed,
+                count / elapsed if elapsed else 0
+            )
+        except Exception as e:
+            put(_Failure(e))
+        finally:
+            put(_DONE)
+
+    pool = ThreadPoolExecutor(max_workers=max_workers or total_segments)
+    for segment in range(total_segments):
+        pool.submit(scan_segment, segment)
+
+    finished = 0
+    try:
+        while finished < total_segments:
+            item = items.get()
+            if item is _DONE:
+                finished += 1
+            elif isinstance(item, _Failure):
+                raise item.error
+            elif deserialize:
+                yield {k: deserialiser.deserialize(v) for k, v in item.items()}
+            else:
+                yield item
+    finally:
+        stop.set()
+        pool.shutdown(wait=False)
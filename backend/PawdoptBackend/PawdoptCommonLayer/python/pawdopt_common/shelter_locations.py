@@ -0,0 +1,99 @@
+import os
+
+from pawdopt_common.cache import LRUCache
+from pawdopt_common.dynamo_batch import batch_get
+from pawdopt_common.log import get_logger
+
+logger = get_logger(__name__)
+
+SHELTER_LOCATION_TABLE = os.environ.get('SHELTER_LOCATION_TABLE', 'shelter_location')
+DEFAULT_LOCATION = (51.5074, -0.1278)  # London
+
+# Shared by every invocation that lands on this container
+_cache = LRUCache(
+    maxsize=int(os.environ.get('SHELTER_CACHE_SIZE', '5000')),
+    ttl=float(os.environ.get('SHELTER_CACHE_TTL_SECONDS', '900')),
+)
+
+
+def _batch_read(client, shelter_ids):
+    """Read shelter locations from the projection table in batched reads."""
+    items = batch_get(
+        client, SHELTER_LOCATION_TABLE,
+        [{'shelter_id': {'S': shelter_id}} for shelter_id in shelter_ids],
+        ('shelter_id',),
+        attributes=['latitude', 'longitude'],
+    )
+    return {
+        item['shelter_id']: (float(item['latitude']), float(item['longitude']))
+        for item in items if item
+    }
+
+
+def _read_from_cognito(cognito, user_pool_id, shelter_id):
+    """The shelter's (lat, lon) from Cognito, or None if it has no coordinates."""
+    user = cognito.admin_get_user(UserPoolId=user_pool_id, Username=shelter_id)
+    attrs = {a["Name"]: a["Value"] for a in user["UserAttributes"]}
+    if not attrs.get("custom:latitude") or not attrs.get("custom:longitude"):
+        return None
+    return float(attrs["custom:latitude"]), float(attrs["custom:longitude"])
+
+
+def put_shelter_location(client, shelter_id, lat, lon):
+    """Write a shelter's location to the projection table and the local cache."""
+    client.put_item(
+        TableName=SHELTER_LOCATION_TABLE,
+        Item={
+            'shelter_id': {'S': shelter_id},
+            'latitude': {'N': str(lat)},
+            'longitude': {'N': str(lon)},
+        }
+    )
+    _cache.set(shelter_id, (float(lat), float(lon)))
+
+
+def get_shelter_locations(client, shelter_ids, cognito=None, user_pool_id=None,
+                          default=DEFAULT_LOCATION):
+    """
+    Return {shelter_id: (lat, lon)} for the given shelters.
+
+    Lookups go to the warm-container cache first, then to the DynamoDB
+    projection in one batch read. Shelters missing from the projection
+    (created before it existed) are read from Cognito once and written
+    back, so later cold starts find them in the projection. Shelters with
+    no known location get `default`, which is never stored; with
+    `default=None` they are left out.
+    """
+    locations = {}
+    missing = []
+    for shelter_id in dict.fromkeys(shelter_ids):
+        cached = _cache.get(shelter_id)
+        if cached is not None:
+            locations[shelter_id] = cached
+        else:
+            missing.append(shelter_id)
+
+    if missing:
+        loaded = _batch_read(client, missing)
+        for shelter_id, location in loaded.items():
+            _cache.set(shelter_id, location)
+        locations.update(loaded)
+
+    for shelter_id in missing:
+        if shelter_id in locations:
+            continue
+        location = None
+        if cognito is not None:
+            try:
+                location = _read_from_cognito(cognito, user_pool_id, shelter_id)
+                if location:
+                    put_shelter_location(client, shelter_id, *location)
+            except Exception as e:
+                logger.warning('Could not read the location of shelter %s: %s', shelter_id, e)
+        if location:
+            locations[shelter_id] = location
+        elif default:
+            logger.warning('Shelter %s has no location; using the default', shelter_id)
+            locations[shelter_id] = default
+
+    return locations
@@ -0,0 +1,41 @@
+import os
+
+SWIPE_TABLE = 'swipe'
+
+# Which swipe directions hide a dog from the adopter's deck:
+# "right" keeps left-swiped dogs in the deck, "all" hides every swiped dog.
+SWIPE_EXCLUDE_DIRECTIONS = os.environ.get('SWIPE_EXCLUDE_DIRECTIONS', 'right')
+
+
+def excluded_directions(setting=None):
+    """Parse the exclusion setting into a set of directions, or None for all."""
+    setting = (setting or SWIPE_EXCLUDE_DIRECTIONS).strip().lower()
+    if setting == 'all':
+        return None
+    return {d.strip() for d in setting.split(',') if d.strip()}
+
+
+def load_swiped_dog_ids(client, adopter_id, directions=None, table_name=SWIPE_TABLE):
+    """
+    Return the set of dog IDs the adopter has swiped in the given directions.
+
+    The adopter's swipe partition is read once, following every page, and
+    only the two attributes needed are projected. `directions=None` means
+    every direction counts.
+    """
+    swiped = set()
+    query_kwargs = {
+        'TableName': table_name,
+        'KeyConditionExpression': 'adopter_id = :adopter_id',
+        'ExpressionAttributeValues': {':adopter_id': {'S': adopter_id}},
+        'ProjectionExpression': 'dog_id, direction',
+    }
+    while True:
+        response = client.query(**query_kwargs)
+        for item in response.get('Items', []):
+            direction = item.get('direction', {}).get('S')
+            if directions is None or direction in directions:
+                swiped.add(item['dog_id']['S'])
+        if 'LastEvaluatedKey' not in response:
+            return swiped
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
@@ -0,0 +1,76 @@
+"""
+Stamp a geohash on dog items created before the geohash index existed.
+
+The nearby lookup only finds dogs through `geohash-index`, so a dog without
+a `geohash` never reaches an adopter's deck once geohashed dogs are nearby.
+Each such dog gets the cell of its shelter's location (shelter_location
+projection, then Cognito when USER_POOL_ID is set). Dogs that gained a
+geohash meanwhile are left alone. Set DYNAMODB_ENDPOINT_URL to point at
+DynamoDB Local.
+
+Run from PawdoptCommonLayer: python scripts/backfill_geohash.py [--dry-run]
+"""
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+from pawdopt_common import geohash  # noqa: E402
+from pawdopt_common.scan import parallel_scan  # noqa: E402
+from pawdopt_common.shelter_locations import get_shelter_locations  # noqa: E402
+
+DOG_TABLE = os.environ.get('DOG_TABLE', 'dog')
+USER_POOL_ID = os.environ.get('USER_POOL_ID')
+
+
+def dogs_without_geohash(client):
+    """{shelter_id: [(dog_id, created_at)]} for every dog missing a geohash."""
+    dogs = defaultdict(list)
+    for dog in parallel_scan(
+        client, DOG_TABLE,
+        FilterExpression='attribute_not_exists(geohash) AND attribute_exists(shelter_id)',
+        ProjectionExpression='dog_id, created_at, shelter_id',
+    ):
+        dogs[dog['shelter_id']].append((dog['dog_id'], dog['created_at']))
+    return dogs
+
+
+def stamp(client, dog_id, created_at, cell):
+    try:
+        client.update_item(
+            TableName=DOG_TABLE,
+            Key={'dog_id': {'S': dog_id}, 'created_at': {'S': created_at}},
+            UpdateExpression='SET geohash = :cell, updated_at = :now',
+            ConditionExpression='attribute_exists(dog_id) AND attribute_not_exists(geohash)',
+            ExpressionAttributeValues={':cell': {'S': cell}, ':now': {'S': datetime.utcnow().isoformat()}},
+        )
+        return True
+    except client.exceptions.ConditionalCheckFailedException:
+        return False
+
+
+def main():
+    dry_run = '--dry-run' in sys.argv[1:]
+    client = boto3.client('dynamodb', endpoint_url=os.environ.get('DYNAMODB_ENDPOINT_URL'))
+    cognito = boto3.client('cognito-idp') if USER_POOL_ID else None
+
+    dogs = dogs_without_geohash(client)
+    locations = get_shelter_locations(client, list(dogs), cognito=cognito, user_pool_id=USER_POOL_ID)
+    stamped = skipped = 0
+    for shelter_id, keys in dogs.items():
+        cell = geohash.encode(*locations[shelter_id])
+        for dog_id, created_at in keys:
+            if dry_run or stamp(client, dog_id, created_at, cell):
+                stamped += 1
+            else:
+                skipped += 1
+        print(f"{shelter_id}: {len(keys)} dogs -> {cell}")
+    print(f"{'would stamp' if dry_run else 'stamped'}={stamped} skipped={skipped} shelters={len(dogs)}")
+
+
+if __name__ == '__main__':
+    main()
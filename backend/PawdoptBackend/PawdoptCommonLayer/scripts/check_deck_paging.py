@@ -0,0 +1,175 @@
+"""
+Regression check: paging NearestDogs with a small limit returns exactly the
+globally sorted deck.
+
+Runs the real NearestDogs handler against an in-memory DynamoDB stand-in
+with shelters spread over several geohash rings, some adopted dogs and
+right swipes, and several dogs per shelter so distances tie. Every page is
+followed through x-next and the concatenation is compared with all eligible
+dogs sorted by (distance, dog id). No AWS access is needed.
+
+Run from PawdoptCommonLayer: python scripts/check_deck_paging.py [limit] [shelters] [seed]
+"""
+import importlib.util
+import json
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, '..', 'python'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-2')
+os.environ.setdefault('DECK_CANDIDATE_TARGET', '10')
+os.environ.setdefault('MAX_SEARCH_RADIUS_KM', '100')
+
+from pawdopt_common import geohash  # noqa: E402
+from pawdopt_common.geo import haversine_many  # noqa: E402
+
+ADOPTER = 'adopter-1'
+ADOPTER_LOCATION = (51.5074, -0.1278)
+
+
+def load_handler():
+    path = os.path.join(ROOT, '..', '..', 'NearestDogs', 'lambda_function.py')
+    spec = importlib.util.spec_from_file_location('nearest_dogs', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeDynamo:
+    """Just enough of the low-level client for the nearby lookup, swipes and shelter projection."""
+
+    def __init__(self, dogs, swipes, shelters):
+        self.dogs = dogs
+        self.swipes = swipes
+        self.shelters = shelters
+
+    def query(self, **kwargs):
+        values = kwargs['ExpressionAttributeValues']
+        if kwargs.get('IndexName') == 'geohash-index':
+            cell = values[':cell']['S']
+            return {'Items': [dog for dog in self.dogs if dog['geohash']['S'] == cell]}
+        adopter_id = values[':adopter_id']['S']
+        return {'Items': [swipe for swipe in self.swipes if swipe['adopter_id']['S'] == adopter_id]}
+
+    def batch_get_item(self, RequestItems):
+        (table_name, request), = RequestItems.items()
+        return {'Responses': {table_name: [
+            {
+                'shelter_id': key['shelter_id'],
+                'latitude': {'N': str(self.shelters[key['shelter_id']['S']][0])},
+                'longitude': {'N': str(self.shelters[key['shelter_id']['S']][1])},
+            }
+            for key in request['Keys'] if key['shelter_id']['S'] in self.shelters
+        ]}}
+
+    def scan(self, **kwargs):
+        return {'Items': self.dogs if kwargs.get('Segment', 0) == 0 else []}
+
+
+class FakeResource:
+    def __init__(self, client):
+        self.meta = type('Meta', (), {'client': client})()
+
+
+class FakeCognito:
+    def admin_get_user(self, UserPoolId, Username):
+        lat, lon = ADOPTER_LOCATION
+        return {'UserAttributes': [
+            {'Name': 'custom:latitude', 'Value': str(lat)},
+            {'Name': 'custom:longitude', 'Value': str(lon)},
+        ]}
+
+
+class FakeSigner:
+    def sign_all(self, keys):
+        return list(keys)
+
+
+def make_world(shelter_count, rng):
+    shelters = {}
+    dogs = []
+    swipes = []
+    for s in range(shelter_count):
+        # Within 60km, so every dog lies inside MAX_SEARCH_RADIUS_KM
+        lat = ADOPTER_LOCATION[0] + rng.uniform(-0.5, 0.5)
+        lon = ADOPTER_LOCATION[1] + rng.uniform(-0.5, 0.5)
+        shelter_id = f'shelter-{s:03d}'
+        shelters[shelter_id] = (lat, lon)
+        for d in range(rng.randint(1, 4)):
+            dog_id = f'dog-{s:03d}-{d}'
+            status = 'ADOPTED' if rng.random() < 0.1 else 'AVAILABLE'
+            dogs.append({
+                'dog_id': {'S': dog_id},
+                'created_at': {'S': f'2025-01-01T00:00:{d:02d}'},
+                'shelter_id': {'S': shelter_id},
+                'geohash': {'S': geohash.encode(lat, lon)},
+                'dog_status': {'S': status},
+                'name': {'S': dog_id},
+            })
+            if rng.random() < 0.1:
+                direction = rng.choice(['left', 'right'])
+                swipes.append({'adopter_id': {'S': ADOPTER}, 'dog_id': {'S': dog_id}, 'direction': {'S': direction}})
+    return shelters, dogs, swipes
+
+
+def expected_order(shelters, dogs, swipes):
+    hidden = {swipe['dog_id']['S'] for swipe in swipes if swipe['direction']['S'] == 'right'}
+    eligible = [
+        dog for dog in dogs
+        if dog['dog_status']['S'] == 'AVAILABLE' and dog['dog_id']['S'] not in hidden
+    ]
+    locations = [shelters[dog['shelter_id']['S']] for dog in eligible]
+    distances = haversine_many(
+        *ADOPTER_LOCATION, [lat for lat, _ in locations], [lon for _, lon in locations]
+    ).round(2)
+    return [dog_id for _, dog_id in sorted(
+        (float(distance), dog['dog_id']['S']) for distance, dog in zip(distances, eligible)
+    )]
+
+
+def page_through(handler, limit):
+    dog_ids = []
+    cursor = None
+    for _ in range(10000):
+        params = {'limit': str(limit)}
+        if cursor:
+            params['cursor'] = cursor
+        event = {
+            'requestContext': {'authorizer': {'jwt': {'claims': {'sub': ADOPTER}}}},
+            'headers': {},
+            'queryStringParameters': params,
+        }
+        response = handler.lambda_handler(event, None)
+        assert response['statusCode'] == 200, response
+        dog_ids.extend(dog['id'] for dog in json.loads(response['body'])['dogs'])
+        cursor = response['headers'].get('x-next')
+        if not cursor:
+            return dog_ids
+    raise RuntimeError('Paging did not terminate')
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    shelter_count = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    rng = random.Random(int(sys.argv[3]) if len(sys.argv) > 3 else 7)
+
+    shelters, dogs, swipes = make_world(shelter_count, rng)
+    handler = load_handler()
+    handler.dynamodb = FakeResource(FakeDynamo(dogs, swipes, shelters))
+    handler.cognito = FakeCognito()
+    handler.signer = FakeSigner()
+
+    expected = expected_order(shelters, dogs, swipes)
+    paged = page_through(handler, limit)
+    print(f"limit={limit} shelters={shelter_count} dogs={len(dogs)} eligible={len(expected)} paged={len(paged)}")
+    if paged != expected:
+        first = next((i for i, (a, b) in enumerate(zip(paged, expected)) if a != b), min(len(paged), len(expected)))
+        print(f"MISMATCH at position {first}: paged={paged[first:first + 5]} expected={expected[first:first + 5]}")
+        sys.exit(1)
+    print("OK: paged deck matches the global order")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,16 +2,30 @@ import boto3
 import os
 import json
 import uuid
+from pawdopt_common.signing import PhotoSigner
+from pawdopt_common.log import get_logger, log_payload
+
+logger = get_logger(__name__)
 
 s3 = boto3.client('s3')
 BUCKET_NAME = 'ICON_BUCKET' # Replace with your Icon Bucket
+MAX_UPLOAD_URLS = int(os.environ.get('MAX_UPLOAD_URLS', '6'))
+signer = PhotoSigner(s3, bucket=BUCKET_NAME)
 
 def lambda_handler(event, context):
     try:
-        print("Event received:", json.dumps(event)[:300])
+        log_payload(logger, "Event received", event)
 
         body = json.loads(event['body'])
-        count = int(body.get('count', 1))
+        try:
+            count = int(body.get('count', 1))
+        except (AttributeError, TypeError, ValueError):
+            count = 0
+        if count < 1 or count > MAX_UPLOAD_URLS:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": f"count must be between 1 and {MAX_UPLOAD_URLS}"})
+            }
 
         uploader_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
 
@@ -21,11 +35,7 @@ def lambda_handler(event, context):
         for i in range(count):
             unique_filename = f"{uuid.uuid4()}.jpg"
             key = f"{uploader_id}/{unique_filename}"
-            presigned_url = s3.generate_presigned_url(
-                'put_object',
-                Params={'Bucket': BUCKET_NAME, 'Key': key, 'ContentType': 'image/jpeg'},
-                ExpiresIn=300  # URL valid for 5 minutes
-            )
+            presigned_url = signer.sign_upload(key, 'image/jpeg')  # URL valid for 5 minutes
             uploadUrls.append(presigned_url)
             keys.append(key)
 
@@ -41,7 +51,7 @@ def lambda_handler(event, context):
         }
 
     except Exception as e:
-        print("Error generating presigned URLs:", str(e))
+        logger.exception("Error generating presigned URLs: %s", e)
         return {
             "statusCode": 500,
             "body": json.dumps({"error": str(e)})
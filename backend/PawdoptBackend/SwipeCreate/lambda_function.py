@@ -1,51 +1,232 @@
 import boto3
 import json
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
 import uuid
+from pawdopt_common.dynamo_batch import batch_get, batch_write, get_dogs
+from pawdopt_common.log import get_logger, log_payload
+from pawdopt_common.swipes import SWIPE_TABLE, excluded_directions, load_swiped_dog_ids
+
+logger = get_logger(__name__)
 
 dynamodb = boto3.client('dynamodb')
 
+MAX_BATCH_SWIPES = int(os.environ.get('MAX_BATCH_SWIPES', '100'))
+# Directions that take a dog out of the deck; NearestDogs reads the same setting
+EXCLUDED_DIRECTIONS = excluded_directions()
+
 
-def respond(err, res=None, statusCode='400'):
+def respond(err, res=None, statusCode=None):
     return {
-        'statusCode': statusCode if err else '200',
+        'statusCode': statusCode or ('400' if err else '200'),
         'body': err if err else json.dumps(res),
         'headers': {
             'Content-Type': 'application/json',
         },
     }
 
-def create_chat_request(adopter_id, shelter_id, dog_id, dog_created_at, created_at, message = ""):
-    # Create Request
-    table = 'request'
-    print('id', dog_id)
-    request_id = str(uuid.uuid4())
-    insert_item = {
-            'request_id': {'S': request_id},
-            'created_at': {'S': created_at},
-            'adopter_id': {'S': adopter_id},
-            'dog_id': {'S': dog_id},
-            'dog_created_at': {'S': dog_created_at},
-            'shelter_id': {'S': shelter_id},
-            'status': {'S': 'pending'},
-        }
+def swipe_item(adopter_id, swiped_at, dog_id, dog_created_at, shelter_id, direction):
+    return {
+        'adopter_id': {'S': adopter_id},
+        'swiped_at': {'S': swiped_at},
+        'dog_id': {'S': dog_id},
+        'dog_created_at': {'S': dog_created_at},
+        'shelter_id': {'S': shelter_id},
+        'direction': {'S': direction}
+    }
+
+def request_item(request_id, adopter_id, shelter_id, dog_id, dog_created_at, created_at, message = ""):
+    item = {
+        'request_id': {'S': request_id},
+        'created_at': {'S': created_at},
+        'adopter_id': {'S': adopter_id},
+        'dog_id': {'S': dog_id},
+        'dog_created_at': {'S': dog_created_at},
+        'shelter_id': {'S': shelter_id},
+        'status': {'S': 'pending'},
+    }
     if message:
-        insert_item['message'] = {'S': message}
-    dynamodb.put_item(
-        TableName=table,
-        Item=insert_item
+        item['message'] = {'S': message}
+    return item
+
+def swipe_result(adopter_id, swiped_at, dog_id, dog_created_at, shelter_id, direction):
+    return {
+        'adopterId': adopter_id,
+        'swipedAt': swiped_at,
+        'dogId': dog_id,
+        'dogCreatedAt': dog_created_at,
+        'shelterId': shelter_id,
+        'direction': direction,
+    }
+
+def create_swipe(adopter_id, dog_id, dog_created_at, shelter_id, direction):
+    """
+    Write one swipe, and its request for a right swipe, in a single transaction.
+
+    The transaction also checks that the dog exists and belongs to
+    `shelter_id`, so there is never a swipe without its request or one
+    for a missing dog. Returns the written swipe, as the `Swipe` schema.
+    """
+    now = datetime.utcnow().isoformat()
+    writes = [
+        {
+            'ConditionCheck': {
+                'TableName': 'dog',
+                'Key': {'dog_id': {'S': dog_id}, 'created_at': {'S': dog_created_at}},
+                'ConditionExpression': 'attribute_exists(dog_id) AND shelter_id = :shelter_id',
+                'ExpressionAttributeValues': {':shelter_id': {'S': shelter_id}},
+            }
+        },
+        {
+            'Put': {
+                'TableName': 'swipe',
+                'Item': swipe_item(adopter_id, now, dog_id, dog_created_at, shelter_id, direction),
+                'ConditionExpression': 'attribute_not_exists(adopter_id) AND attribute_not_exists(swiped_at)',
+            }
+        },
+    ]
+    if direction == 'right':
+        request_id = str(uuid.uuid4())
+        logger.debug('Creating request %s for dog %s', request_id, dog_id)
+        writes.append({
+            'Put': {
+                'TableName': 'request',
+                'Item': request_item(request_id, adopter_id, shelter_id, dog_id, dog_created_at, now),
+                'ConditionExpression': 'attribute_not_exists(request_id)',
+            }
+        })
+
+    dynamodb.transact_write_items(TransactItems=writes)
+    result = swipe_result(adopter_id, now, dog_id, dog_created_at, shelter_id, direction)
+    log_payload(logger, 'New swipe', result)
+    return result
+
+def cancellation_status(error):
+    """Map a cancelled swipe transaction to (message, status code)."""
+    reasons = [r.get('Code') for r in error.response.get('CancellationReasons', [])]
+    if reasons and reasons[0] == 'ConditionalCheckFailed':
+        return 'Dog not found', 404
+    if len(reasons) > 1 and reasons[1] == 'ConditionalCheckFailed':
+        return 'Swipe already exists', 409
+    if 'TransactionConflict' in reasons:
+        return 'Swipe conflicted with another write, please retry', 409
+    return f'Swipe not recorded: {reasons}', 500
+
+def hides_dog(direction):
+    """Whether a swipe in `direction` takes the dog out of the adopter's deck."""
+    return EXCLUDED_DIRECTIONS is None or direction in EXCLUDED_DIRECTIONS
+
+def remove_from_deck(adopter_id, *dog_ids):
+    """
+    Mark swiped dogs in the adopter's swipe_dogs deck so paging skips them.
+
+    Runs after the swipes are written, so a failure is only logged: the
+    swipe stands, and failing the request would make a retry hit 409.
+    """
+    if not dog_ids:
+        return
+    try:
+        dynamodb.update_item(
+            TableName='swipe_dogs',
+            Key={'adopter_id': {'S': adopter_id}},
+            UpdateExpression='ADD swiped :dog',
+            ExpressionAttributeValues={':dog': {'SS': list(set(dog_ids))}},
+            ConditionExpression='attribute_exists(adopter_id)'
+        )
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        # No deck built for this adopter yet
+        pass
+    except Exception:
+        logger.exception('Could not update deck for adopter %s', adopter_id)
+
+def create_swipes(adopter_id, swipes):
+    """
+    Record a batch of swipes, returning one result per swipe in input order.
+
+    Dogs are checked with one batched read, then every swipe (and a request
+    for each right swipe) goes out through BatchWriteItem. Swipes in a batch
+    get consecutive microsecond timestamps so their keys never collide.
+    BatchWriteItem takes no conditions, so swipe keys that already exist and
+    right swipes on dogs the adopter already requested are reported as 409
+    instead of being written.
+    """
+    results = [None] * len(swipes)
+    valid = []
+    seen = set()
+    for i, swipe in enumerate(swipes):
+        dog_id = swipe.get('dogId') if isinstance(swipe, dict) else None
+        dog_created_at = swipe.get('dogCreatedAt') if dog_id else None
+        direction = swipe.get('direction') if dog_id else None
+        if not dog_id or not dog_created_at or not direction:
+            results[i] = {'dogId': dog_id, 'status': 400, 'error': 'dogId, dogCreatedAt and direction are required'}
+        elif dog_id in seen:
+            results[i] = {'dogId': dog_id, 'status': 409, 'error': 'Dog swiped twice in one batch'}
+        else:
+            seen.add(dog_id)
+            valid.append(i)
+
+    dogs = get_dogs(
+        dynamodb, [(swipes[i]['dogId'], swipes[i]['dogCreatedAt']) for i in valid],
+        attributes=['shelter_id']
     )
-    new = dynamodb.get_item(
-        TableName=table,
-        Key={
-            'request_id': {'S': request_id},
-            'created_at': {'S': created_at}
-        }
-    ).get('Item')
+    requested = set()
+    if any(swipes[i]['direction'] == 'right' for i in valid):
+        requested = load_swiped_dog_ids(dynamodb, adopter_id, {'right'})
 
-    print(new)
+    base = datetime.utcnow()
+    candidates = []
+    for n, (i, dog) in enumerate(zip(valid, dogs)):
+        swipe = swipes[i]
+        if not dog:
+            results[i] = {'dogId': swipe['dogId'], 'status': 404, 'error': 'Dog not found'}
+        elif not dog.get('shelter_id'):
+            results[i] = {'dogId': swipe['dogId'], 'status': 500, 'error': 'Dog has no shelter'}
+        elif swipe['direction'] == 'right' and dog['dog_id'] in requested:
+            results[i] = {'dogId': swipe['dogId'], 'status': 409, 'error': 'Dog already swiped right'}
+        else:
+            candidates.append((i, dog, (base + timedelta(microseconds=n)).isoformat()))
+
+    existing = batch_get(
+        dynamodb, SWIPE_TABLE,
+        [{'adopter_id': {'S': adopter_id}, 'swiped_at': {'S': swiped_at}} for _, _, swiped_at in candidates],
+        ['adopter_id', 'swiped_at'], attributes=[]
+    ) if candidates else []
+
+    puts = []
+    swiped_ids = []
+    hidden_ids = []
+    for (i, dog, swiped_at), found in zip(candidates, existing):
+        if found:
+            results[i] = {'dogId': dog['dog_id'], 'status': 409, 'error': 'Swipe already exists'}
+            continue
+
+        direction = swipes[i]['direction']
+        puts.append((SWIPE_TABLE, swipe_item(
+            adopter_id, swiped_at, dog['dog_id'], dog['created_at'], dog['shelter_id'], direction
+        )))
+        result = {
+            'dogId': dog['dog_id'],
+            'status': 201,
+            'swipe': swipe_result(
+                adopter_id, swiped_at, dog['dog_id'], dog['created_at'], dog['shelter_id'], direction
+            ),
+        }
+        if direction == 'right':
+            request_id = str(uuid.uuid4())
+            puts.append(('request', request_item(
+                request_id, adopter_id, dog['shelter_id'], dog['dog_id'], dog['created_at'], swiped_at
+            )))
+            result['requestId'] = request_id
+        results[i] = result
+        swiped_ids.append(dog['dog_id'])
+        if hides_dog(direction):
+            hidden_ids.append(dog['dog_id'])
 
-    return new
+    if puts:
+        batch_write(dynamodb, puts)
+        remove_from_deck(adopter_id, *hidden_ids)
+    logger.info('Recorded %d of %d swipes for adopter %s', len(swiped_ids), len(swipes), adopter_id)
+    return results
 
 def lambda_handler(event, context):
     operation = event['requestContext']['http']['method']
@@ -53,63 +234,38 @@ def lambda_handler(event, context):
         try:
             body = json.loads(event['body'])
 
+            if event['requestContext']['authorizer']['jwt']['claims']['custom:role'] == 'shelter':
+                return respond('Forbidden user', None, 403)
+
             adopter_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
-            print('adopterid', adopter_id)
+
+            # Batch mode: a list of swipes, or {"swipes": [...]}
+            swipes = body if isinstance(body, list) else body.get('swipes')
+            if swipes is not None:
+                if not isinstance(swipes, list) or not swipes:
+                    return respond('swipes must be a non-empty list')
+                if len(swipes) > MAX_BATCH_SWIPES:
+                    return respond(f'At most {MAX_BATCH_SWIPES} swipes per request')
+                return respond(None, {'results': create_swipes(adopter_id, swipes)})
+
+            logger.debug('Swipe from adopter %s', adopter_id)
             dog_id = body.get('dogId')
             dog_created_at = body.get('dogCreatedAt')
             shelter_id = body.get('shelterId')
             direction = body.get('direction')
+            if not dog_id or not dog_created_at or not shelter_id or not direction:
+                return respond('dogId, dogCreatedAt, shelterId and direction are required')
 
-            now = datetime.utcnow().isoformat()
-
-            dogExist = dynamodb.get_item(
-                TableName='dog',
-                Key={
-                    'dog_id': {'S': dog_id},           
-                    'created_at': {'S': dog_created_at}
-                }
-            )
+            try:
+                result = create_swipe(adopter_id, dog_id, dog_created_at, shelter_id, direction)
+            except dynamodb.exceptions.TransactionCanceledException as e:
+                message, status = cancellation_status(e)
+                return respond(message, None, status)
 
-            if event['requestContext']['authorizer']['jwt']['claims']['custom:role'] == 'shelter':
-                return respond('Forbidden user', None, 403)
+            if hides_dog(direction):
+                remove_from_deck(adopter_id, dog_id)
 
-            if dogExist['Item']:
-                dynamodb.put_item(
-                    TableName='swipe',
-                    Item={
-                    'adopter_id': {'S': adopter_id},
-                    'swiped_at': {'S': now},
-                    'dog_id': {'S': dog_id},
-                    'dog_created_at': {'S': dog_created_at},
-                    'shelter_id': {'S': shelter_id},
-                    'direction': {'S': direction}
-                    },
-                    ConditionExpression='attribute_not_exists(adopter_id) AND attribute_not_exists(swiped_at)'
-                )
-
-                res = {
-                    "statusCode": 200,
-                    "body": json.dumps(dynamodb.get_item(
-                        TableName='swipe',
-                        Key={
-                        'adopter_id': {'S': adopter_id},
-                        'swiped_at': {'S': now}
-                    })),
-                    "headers": {
-                        "Content-Type": "application/json"
-                    }
-                }
-
-                if direction == 'right':
-                    # Create chat
-                    new_chat = create_chat_request(adopter_id, shelter_id, dog_id, dog_created_at, now)
-                    if not new_chat:
-                        return respond('Failed to create chat or request', None, 500)
-
-                return respond(None, res)
-
-            else:
-                return ("Swipe already exists")
+            return respond(None, result, '201')
 
         except Exception as e:
             return respond(str(e), None, 500)
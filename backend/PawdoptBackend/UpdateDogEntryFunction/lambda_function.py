@@ -4,11 +4,24 @@ import json
 from datetime import datetime
 from boto3.dynamodb.conditions import Key
 from decimal import Decimal
+from pawdopt_common.cache import LRUCache
+from boto3.dynamodb.types import TypeSerializer
+from pawdopt_common.events import DOG_ADOPTED, SUBSCRIBERS, get_dispatcher, make_event
+from pawdopt_common.photo_variants import link_photos
+from pawdopt_common.log import get_logger, log_payload
+
+logger = get_logger(__name__)
 
 dynamodb = boto3.resource('dynamodb')
 TABLE_NAME = 'dog'
 lambda_client = boto3.client('lambda')
 
+serialiser = TypeSerializer()
+
+# dog_id -> created_at, for clients that don't send x-created-at
+created_at_cache = LRUCache(maxsize=10000)
+dispatcher = get_dispatcher(SUBSCRIBERS, lambda_client=lambda_client, dynamo_client=dynamodb.meta.client)
+
 
 # Add this helper function to convert Decimals
 def convert_decimals(obj):
@@ -22,9 +35,67 @@ def convert_decimals(obj):
     else:
         return obj
 
+def resolve_created_at(event, table, dog_id):
+    """Sort key from the x-created-at header, the key cache, or one key-only query."""
+    created_at = (event.get('headers') or {}).get('x-created-at') or created_at_cache.get(dog_id)
+    if created_at:
+        return created_at
+    items = table.query(
+        KeyConditionExpression=Key('dog_id').eq(dog_id),
+        ProjectionExpression='created_at',
+        Limit=1
+    ).get('Items', [])
+    if not items:
+        return None
+    created_at_cache.set(dog_id, items[0]['created_at'])
+    return items[0]['created_at']
+
+class UpdateRejected(Exception):
+    """The update's condition failed; `old_item` is the dog as stored, or None if it doesn't exist."""
+
+    def __init__(self, old_item):
+        super().__init__('Dog update rejected')
+        self.old_item = old_item
+
+def update_dog(table, update_params, outbox_put=None):
+    """
+    Apply the dog update and return the new item.
+
+    With `outbox_put`, the event's outbox row is written in the same
+    TransactWriteItems, so the event exists exactly when the change does,
+    and the new item is read back consistently.
+    """
+    client = dynamodb.meta.client
+    if outbox_put is None:
+        try:
+            return table.update_item(**update_params)['Attributes']
+        except client.exceptions.ConditionalCheckFailedException as e:
+            raise UpdateRejected(e.response.get('Item'))
+
+    update = {
+        'TableName': TABLE_NAME,
+        'Key': {k: serialiser.serialize(v) for k, v in update_params['Key'].items()},
+        'UpdateExpression': update_params['UpdateExpression'],
+        'ConditionExpression': update_params['ConditionExpression'],
+        'ExpressionAttributeValues': {
+            k: serialiser.serialize(v) for k, v in update_params['ExpressionAttributeValues'].items()
+        },
+        'ReturnValuesOnConditionCheckFailure': 'ALL_OLD',
+    }
+    if 'ExpressionAttributeNames' in update_params:
+        update['ExpressionAttributeNames'] = update_params['ExpressionAttributeNames']
+    try:
+        client.transact_write_items(TransactItems=[{'Update': update}, outbox_put])
+    except client.exceptions.TransactionCanceledException as e:
+        reason = (e.response.get('CancellationReasons') or [{}])[0]
+        if reason.get('Code') == 'ConditionalCheckFailed':
+            raise UpdateRejected(reason.get('Item'))
+        raise
+    return table.get_item(Key=update_params['Key'], ConsistentRead=True)['Item']
+
 def lambda_handler(event, context):
     try:
-        print("Event received:", json.dumps(event)[:500])
+        log_payload(logger, "Event received", event)
         
         # Extract dog_id from path parameters
         dog_id = event['pathParameters']['dogId']
@@ -36,34 +107,28 @@ def lambda_handler(event, context):
         
         # Parse request body
         body = json.loads(event['body'])
-        print("Request body:", json.dumps(body, indent=2))
+        log_payload(logger, "Request body", body)
         
+        # Adoption events need the adopter (chatCRUD closes the other chats)
+        adopting = body.get('dogStatus') == 'ADOPTED'
+        if adopting and not body.get('adopterId'):
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": "adopterId is required when marking a dog ADOPTED"})
+            }
+
         # Extract user ID from JWT token
         uploader_id = event['requestContext']['authorizer']['jwt']['claims']['sub']
         
         table = dynamodb.Table(TABLE_NAME)
         
-        # First, check if the dog exists and belongs to this user
-        response = table.query(
-            KeyConditionExpression=Key('dog_id').eq(dog_id)
-        )
-        items = response.get('Items', [])
-        
-        if not items:
+        created_at = resolve_created_at(event, table, dog_id)
+        if not created_at:
             return {
                 "statusCode": 404,
                 "body": json.dumps({"error": f"Dog with ID {dog_id} not found"})
             }
         
-        existing_dog = items[0]
-        
-        # Verify ownership
-        if existing_dog.get('shelter_id') != uploader_id:
-            return {
-                "statusCode": 403,
-                "body": json.dumps({"error": "You don't have permission to update this dog"})
-            }
-        
         # Build update expression dynamically based on provided fields
         update_expression_parts = []
         expression_attribute_names = {}
@@ -97,41 +162,64 @@ def lambda_handler(event, context):
                 
                 expression_attribute_values[f":{db_field}"] = body[frontend_field]
         
-        # Add updated timestamp
-        update_expression_parts.append("updated_at = :updated_at")
-        expression_attribute_values[":updated_at"] = datetime.utcnow().isoformat()
-        
         if not update_expression_parts:
             return {
                 "statusCode": 400,
                 "body": json.dumps({"error": "No valid fields provided for update"})
             }
         
+        # Add updated timestamp
+        update_expression_parts.append("updated_at = :updated_at")
+        expression_attribute_values[":updated_at"] = datetime.utcnow().isoformat()
+        
         # Construct the full update expression
         update_expression = "SET " + ", ".join(update_expression_parts)
         
-        print("Update expression:", update_expression)
-        print("Expression attribute names:", expression_attribute_names)
-        print("Expression attribute values:", expression_attribute_values)
+        logger.debug("Update expression: %s", update_expression)
+        logger.debug("Expression attribute names: %s", expression_attribute_names)
+        log_payload(logger, "Expression attribute values", expression_attribute_values)
         
-        # Perform the update
+        # Perform the update; existence and ownership are checked in the same call
+        expression_attribute_values[":uploader_id"] = uploader_id
         update_params = {
             'Key': {
                 'dog_id': dog_id, 
-                'created_at': existing_dog['created_at']
+                'created_at': created_at
             },
             'UpdateExpression': update_expression,
+            'ConditionExpression': 'attribute_exists(dog_id) AND shelter_id = :uploader_id',
             'ExpressionAttributeValues': expression_attribute_values,
-            'ReturnValues': 'ALL_NEW'
+            'ReturnValues': 'ALL_NEW',
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
         }
         
         # Add attribute names if we have any
         if expression_attribute_names:
             update_params['ExpressionAttributeNames'] = expression_attribute_names
         
-        update_response = table.update_item(**update_params)
-        
-        updated_item = update_response['Attributes']
+        adopted_event = None
+        if adopting:
+            adopted_event = make_event(DOG_ADOPTED, {"adopter_id": body['adopterId'], "dog_id": dog_id})
+
+        try:
+            updated_item = update_dog(
+                table, update_params,
+                dispatcher.put_request(adopted_event) if adopted_event and dispatcher.transactional else None
+            )
+        except UpdateRejected as e:
+            if not e.old_item:
+                created_at_cache.pop(dog_id)
+                return {
+                    "statusCode": 404,
+                    "body": json.dumps({"error": f"Dog with ID {dog_id} not found"})
+                }
+            return {
+                "statusCode": 403,
+                "body": json.dumps({"error": "You don't have permission to update this dog"})
+            }
+        created_at_cache.set(dog_id, created_at)
+        if body.get('photoKeys'):
+            link_photos(dynamodb.meta.client, dog_id, created_at, body['photoKeys'])
         
         # Convert Decimals before JSON serialization
         updated_item = convert_decimals(updated_item)
@@ -157,25 +245,10 @@ def lambda_handler(event, context):
             }
         }
 
-        if response_data['status'] == 'ADOPTED':
-            adopter_id = updated_item.get('adopter_id')
-            payload = {
-                "action": "updateChatStatus",
-                "payload": {
-                    "adopter_id": adopter_id,
-                    "dog_id": response_data["id"]
-                }   
-            }
-            response = lambda_client.invoke(
-            FunctionName="chatCRUD",
-            InvocationType="RequestResponse",   # synchronous call
-            Payload=json.dumps(payload).encode()
-            )
-            response_payload = json.loads(response['Payload'].read().decode())
-            print("Response from updateChatFunction:", response_payload)
+        if adopted_event and not dispatcher.transactional:
+            # Not durable on its own: a failure here is a 500 so the client retries the edit
+            dispatcher.publish(adopted_event)
 
-
-        
         return {
             "statusCode": 200,
             "body": json.dumps(response_data),
@@ -188,19 +261,19 @@ def lambda_handler(event, context):
         }
         
     except json.JSONDecodeError as e:
-        print("JSON decode error:", str(e))
+        logger.warning("JSON decode error: %s", e)
         return {
             "statusCode": 400,
             "body": json.dumps({"error": "Invalid JSON in request body"})
         }
     except KeyError as e:
-        print("Missing required field:", str(e))
+        logger.warning("Missing required field: %s", e)
         return {
             "statusCode": 400,
             "body": json.dumps({"error": f"Missing required field: {str(e)}"})
         }
     except Exception as e:
-        print("Exception:", str(e))
+        logger.exception("Exception: %s", e)
         return {
             "statusCode": 500,
             "body": json.dumps({"error": str(e)}),
@@ -2,6 +2,116 @@
 
 const AWS = require('aws-sdk');
 
+const SHELTER_LOCATION_TABLE = process.env.SHELTER_LOCATION_TABLE || 'shelter_location';
+const DOG_TABLE = 'dog';
+const SHELTER_INDEX_NAME = 'shelter_id-created_at-index';
+const LOCATION_ATTRIBUTES = ['custom:latitude', 'custom:longitude'];
+
+// Must match pawdopt_common.geohash (precision 4, ~20km cells)
+const GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz';
+const GEOHASH_PRECISION = 4;
+
+function encodeGeohash(lat, lon, precision = GEOHASH_PRECISION) {
+    const latRange = [-90.0, 90.0];
+    const lonRange = [-180.0, 180.0];
+    let geohash = '';
+    let ch = 0;
+    let bit = 0;
+    let even = true;
+    while (geohash.length < precision) {
+        const range = even ? lonRange : latRange;
+        const value = even ? lon : lat;
+        const mid = (range[0] + range[1]) / 2;
+        if (value >= mid) {
+            ch |= 1 << (4 - bit);
+            range[0] = mid;
+        } else {
+            range[1] = mid;
+        }
+        even = !even;
+        if (bit < 4) {
+            bit += 1;
+        } else {
+            geohash += GEOHASH_BASE32[ch];
+            bit = 0;
+            ch = 0;
+        }
+    }
+    return geohash;
+}
+
+// Keep the shelter_location projection and the geohash stamped on the
+// shelter's dogs in step with the Cognito location, which NearestDogs
+// would otherwise never re-read once the projection row exists.
+async function syncShelterLocation(cognito, dynamo, username) {
+    const user = await cognito.adminGetUser({ UserPoolId: 'USERPOOLID', Username: username }).promise();
+    const attrs = Object.fromEntries(user.UserAttributes.map(a => [a.Name, a.Value]));
+    if (attrs['custom:role'] !== 'shelter') {
+        return;
+    }
+    const shelterId = attrs.sub;
+    const latitude = parseFloat(attrs['custom:latitude']);
+    const longitude = parseFloat(attrs['custom:longitude']);
+    if (Number.isNaN(latitude) || Number.isNaN(longitude)) {
+        return;
+    }
+
+    await dynamo.put({
+        TableName: SHELTER_LOCATION_TABLE,
+        Item: { shelter_id: shelterId, latitude, longitude },
+    }).promise();
+
+    const cell = encodeGeohash(latitude, longitude);
+    // Every dog write stamps updated_at; GetDogProfile's Last-Modified relies on it
+    const now = new Date().toISOString().replace('Z', '');
+    let restamped = 0;
+    let startKey;
+    do {
+        const page = await dynamo.query({
+            TableName: DOG_TABLE,
+            IndexName: SHELTER_INDEX_NAME,
+            KeyConditionExpression: 'shelter_id = :shelter_id',
+            ExpressionAttributeValues: { ':shelter_id': shelterId },
+            ProjectionExpression: 'dog_id, created_at, geohash',
+            ExclusiveStartKey: startKey,
+        }).promise();
+        const stale = page.Items.filter(dog => dog.geohash !== cell);
+        await Promise.all(stale.map(dog => dynamo.update({
+            TableName: DOG_TABLE,
+            Key: { dog_id: dog.dog_id, created_at: dog.created_at },
+            UpdateExpression: 'SET geohash = :cell, updated_at = :now',
+            ConditionExpression: 'attribute_exists(dog_id)',
+            ExpressionAttributeValues: { ':cell': cell, ':now': now },
+        }).promise().catch(err => {
+            // Deleted since the query; nothing to restamp
+            if (err.code !== 'ConditionalCheckFailedException') throw err;
+        })));
+        restamped += stale.length;
+        startKey = page.LastEvaluatedKey;
+    } while (startKey);
+    console.log(`Shelter ${shelterId} moved to ${cell}; restamped ${restamped} dogs`);
+}
+
+function attributeError(err) {
+    console.error('Error updating user attributes:', err);
+    let errorMessage = 'Failed to update profile due to an unknown error.';
+    if (err.code === 'UserNotFoundException') {
+        errorMessage = 'User not found.';
+    } else if (err.code === 'NotAuthorizedException') {
+        errorMessage = 'Not authorized to perform this action.';
+    } else if (err.code === 'InvalidParameterException') {
+        errorMessage = `Invalid input: ${err.message}`;
+    } else if (err.code === 'UserLambdaValidationException') {
+        errorMessage = `Validation error: ${err.message}`;
+    }
+
+    return {
+        statusCode: 400,
+        body: JSON.stringify({ error: errorMessage }),
+        headers: { 'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*' },
+    };
+}
+
 exports.handler = async (event) => {
     console.log('Received event for update:', JSON.stringify(event, null, 2));
 
@@ -49,29 +159,27 @@ exports.handler = async (event) => {
 
     try {
         await cognito.adminUpdateUserAttributes(params).promise();
-
-        return {
-            statusCode: 200,
-            body: JSON.stringify({ message: 'User attributes updated successfully.' }),
-            headers: { 'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*' },
-        };
     } catch (err) {
-        console.error('Error updating user attributes:', err);
-        let errorMessage = 'Failed to update profile due to an unknown error.';
-        if (err.code === 'UserNotFoundException') {
-            errorMessage = 'User not found.';
-        } else if (err.code === 'NotAuthorizedException') {
-            errorMessage = 'Not authorized to perform this action.';
-        } else if (err.code === 'InvalidParameterException') {
-            errorMessage = `Invalid input: ${err.message}`;
-        } else if (err.code === 'UserLambdaValidationException') {
-            errorMessage = `Validation error: ${err.message}`;
-        }
+        return attributeError(err);
+    }
 
-        return {
-            statusCode: 400,
-            body: JSON.stringify({ error: errorMessage }),
-            headers: { 'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*' },
-        };
+    if (LOCATION_ATTRIBUTES.some(name => name in attributesToUpdate)) {
+        try {
+            await syncShelterLocation(cognito, new AWS.DynamoDB.DocumentClient({ region: 'REGION' }), username);
+        } catch (err) {
+            // The Cognito update stands; retrying the request is safe
+            console.error('Error syncing shelter location:', err);
+            return {
+                statusCode: 500,
+                body: JSON.stringify({ error: 'Profile updated, but the shelter location could not be synced. Please retry.' }),
+                headers: { 'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*' },
+            };
+        }
     }
+
+    return {
+        statusCode: 200,
+        body: JSON.stringify({ message: 'User attributes updated successfully.' }),
+        headers: { 'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*' },
+    };
 };
\ No newline at end of file
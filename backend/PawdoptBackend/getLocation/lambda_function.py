@@ -3,6 +3,10 @@ import json
 import base64
 from decimal import Decimal
 from boto3.dynamodb.conditions import Key, Attr
+from pawdopt_common.geo import haversine_many
+from pawdopt_common.log import get_logger
+
+logger = get_logger(__name__)
 
 # AWS clients
 dynamodb = boto3.resource('dynamodb')
@@ -41,7 +45,7 @@ def decode_jwt_payload(token):
         
         return payload
     except Exception as e:
-        print(f"JWT decode error: {str(e)}")
+        logger.warning("JWT decode error: %s", e)
         return None
 
 def extract_user_id(event):
@@ -57,7 +61,7 @@ def extract_user_id(event):
             if user_id:
                 return user_id
     except Exception as e:
-        print(f"Error accessing authorizer: {str(e)}")
+        logger.info("Error accessing authorizer: %s", e)
     
     try:
         headers = event.get("headers", {})
@@ -71,11 +75,11 @@ def extract_user_id(event):
         else:
             return None
     except Exception as e:
-        print(f"Error extracting from Authorization header: {str(e)}")
+        logger.warning("Error extracting from Authorization header: %s", e)
         return None
 
 def lambda_handler(event, context):
-    print("📍 getDogLocation Lambda function started")
+    logger.debug("📍 getDogLocation Lambda function started")
     
     cors_headers = {
         "Access-Control-Allow-Origin": "*",
@@ -110,7 +114,7 @@ def lambda_handler(event, context):
                 "body": json.dumps({"error": "Missing dogId or dogCreatedAt in query string parameters"})
             }
         
-        print(f"DEBUG: Attempting to get dog details for dogId: {dog_id} and dogCreatedAt: {dog_created_at}")
+        logger.debug("Attempting to get dog details for dogId: %s and dogCreatedAt: %s", dog_id, dog_created_at)
 
         adopter_details = {}
         try:
@@ -122,7 +126,7 @@ def lambda_handler(event, context):
                 "type": "adopter"
             }
         except Exception as e:
-            print(f"⚠️ Could not get adopter details from Cognito: {str(e)}")
+            logger.warning("⚠️ Could not get adopter details from Cognito: %s", e)
             adopter_details = {
                 "latitude": 51.5074,
                 "longitude": -0.1278,
@@ -144,7 +148,7 @@ def lambda_handler(event, context):
             if dog_details:
                 shelter_id = dog_details.get("shelter_id")
         except Exception as e:
-            print(f"❌ Error accessing DynamoDB for dog {dog_id}: {str(e)}")
+            logger.exception("❌ Error accessing DynamoDB for dog %s: %s", dog_id, e)
             # The Decimal serialization issue can be caught here, so we return a generic 500
             return {
                 "statusCode": 500,
@@ -153,7 +157,7 @@ def lambda_handler(event, context):
             }
             
         if not dog_details:
-            print(f"❌ Dog details for dogId {dog_id} were not found in the table.")
+            logger.info("❌ Dog details for dogId %s were not found in the table.", dog_id)
             return {
                 "statusCode": 404,
                 "headers": cors_headers,
@@ -171,13 +175,19 @@ def lambda_handler(event, context):
                     "type": "shelter"
                 }
         except Exception as e:
-            print(f"⚠️ Could not get shelter details for {shelter_id} from Cognito: {str(e)}")
+            logger.warning("⚠️ Could not get shelter details for %s from Cognito: %s", shelter_id, e)
             shelter_details = {
                 "latitude": 51.5074,
                 "longitude": -0.1278,
                 "type": "shelter"
             }
         
+        distance_km = haversine_many(
+            adopter_details["latitude"], adopter_details["longitude"],
+            [shelter_details.get("latitude", 51.5074)],
+            [shelter_details.get("longitude", -0.1278)]
+        )[0]
+
         # 5️⃣ CORRECTED: Use the custom DecimalEncoder for serialization
         return {
             "statusCode": 200,
@@ -190,12 +200,13 @@ def lambda_handler(event, context):
                     "latitude": shelter_details.get("latitude"),
                     "longitude": shelter_details.get("longitude")
                 },
-                "shelter": shelter_details
+                "shelter": shelter_details,
+                "distanceKm": round(float(distance_km), 2)
             }, cls=DecimalEncoder) # Pass the custom encoder here
         }
         
     except Exception as e:
-        print(f"❌ Unexpected error in lambda function: {str(e)}")
+        logger.exception("❌ Unexpected error in lambda function: %s", e)
         return {
             "statusCode": 500,
             "headers": cors_headers,